@@ -4,11 +4,12 @@ import os
 import json
 from pathlib import Path
 from core.video_processor import VideoProcessor
-from core.ollama_adapter import OllamaAdapter
+from core.frame_cache import FrameCache
+from core.frame_store import FrameStore
+from core.ollama_adapter import OllamaAdapter, client_from_settings
+from core.model_registry import get_registry
 from core.database import DatabaseManager
 # from ui.components import render_flow_graph  # Temporarily disabled
-from jinja2 import Template
-import ollama
 
 # Initialize Database
 db = DatabaseManager()
@@ -28,16 +29,41 @@ st.set_page_config(
 
 # Load Config with Cache
 from core.prompt_manager import YamlPromptLoader
+from core.prompt_builder import PromptRequest
+from ui.streaming import StreamRenderer
+from ui.results import get_result_view, render_look_tabs
+from core.result_adapter import ResultAdapter
+
+result_parser = ResultAdapter()
 
 # Initial Load using Dependency Injection
 # In a real DI framework, this would be injected, but here we wire it up manually at the start.
-loader = YamlPromptLoader()
-
-@st.cache_data
-def load_config():
-    return loader.load_config()
-
-settings, prompts = load_config()
+@st.cache_resource
+def get_loader():
+    # One loader per process: config files are watched and hot-reloaded on change
+    loader = YamlPromptLoader()
+    loader.watch()
+    return loader
+
+loader = get_loader()
+settings, prompts = loader.load_config()
+prompt_builder = loader.prompt_builder() # Templates precompiled at (re)load
+
+# Shared pooled Ollama client (host, timeouts, keep-alive from the `model:` settings)
+ollama_client = client_from_settings(settings)
+analysis_settings = settings.get('analysis', {})
+ui_settings = settings.get('ui', {})
+model_registry = get_registry(ollama_client, ttl_seconds=settings['model'].get('list_ttl', 60))
+
+# Per-session frame store: every frame/image held once, compressed, decoded on demand
+if 'frame_store' not in st.session_state:
+    store_settings = settings.get('frame_store', {})
+    st.session_state['frame_store'] = FrameStore(
+        memory_budget_mb=store_settings.get('memory_budget_mb', 256),
+        image_format=store_settings.get('format', 'JPEG'),
+        quality=store_settings.get('quality', 92)
+    )
+frame_store = st.session_state['frame_store']
 
 # --- GLOBAL CALLBACKS ---
 def lock_identity_callback():
@@ -64,7 +90,7 @@ def lock_identity_callback():
 # Sidebar Reload Button (Must be placed early to affect the rest of the script)
 with st.sidebar:
     if st.button("🔄 Reload Config"):
-        load_config.clear()
+        loader.reload(force=True)
         st.rerun()
 
 # Custom CSS for "Bold & Premium" Look
@@ -143,27 +169,10 @@ with st.sidebar:
         use_locked_identity = False
     # ---------------------------
     
-    # Model Selection
+    # Model Selection (cached list, refreshed in the background)
+    vision_only = st.checkbox("Vision Models Only 👁️", value=True, help="Hide models that cannot read images.")
     try:
-        models_info = ollama.list()
-        
-        model_names = []
-        if hasattr(models_info, 'models'):
-            for m in models_info.models:
-                if hasattr(m, 'model'):
-                    model_names.append(m.model)
-                elif isinstance(m, dict) and 'name' in m:
-                    model_names.append(m['name'])
-                elif isinstance(m, dict) and 'model' in m:
-                    model_names.append(m['model'])
-                else:
-                    model_names.append(str(m))
-        else:
-            for m in models_info:
-                 if isinstance(m, dict):
-                    model_names.append(m.get('name', m.get('model', 'unknown')))
-                 else:
-                    model_names.append(str(m))
+        model_names = model_registry.names(vision_only=vision_only)
 
         default_model = settings['model']['name']
         if default_model not in model_names:
@@ -174,12 +183,26 @@ with st.sidebar:
             options=model_names,
             index=model_names.index(default_model) if default_model in model_names else 0
         )
+        if model_registry.last_error:
+            st.caption(f"⚠️ Model list may be outdated: {model_registry.last_error}")
     except Exception as e:
         st.error(f"Could not fetch models: {e}")
         selected_model = settings['model']['name']
+        model_names = [selected_model]
         st.caption("Using default from settings due to error.")
 
     st.caption(f"Active: `{selected_model}`")
+    model_info = model_registry.get(selected_model)
+    if model_info:
+        details = [d for d in (model_info.family, model_info.parameter_size) if d]
+        if model_info.context_length:
+            details.append(f"{model_info.context_length // 1024}K ctx")
+        if model_info.size:
+            details.append(f"{model_info.size / 1024**3:.1f} GB")
+        if model_info.vision is False:
+            details.append("no vision")
+        if details:
+            st.caption(" · ".join(details))
     
     st.header("Input Source")
     input_mode = st.radio(
@@ -226,6 +249,20 @@ with st.sidebar:
         with st.expander("ℹ️ Mode Description", expanded=False):
             st.markdown(mode_description)
     
+    # Multi-Run: same frames through several modes and/or models at once
+    with st.expander("⚡ Multi-Run", expanded=False):
+        extra_modes = st.multiselect(
+            "Additional Modes",
+            options=[m for m in mode_options if m != analysis_mode],
+            format_func=format_mode_name,
+            help="Also run these modes on the same selection (runs concurrently)."
+        )
+        compare_models = st.multiselect(
+            "Compare With Models",
+            options=[m for m in model_names if m != selected_model],
+            help="Also run the selected mode(s) on these models."
+        )
+    
     if analysis_mode == "style_transfer_pro":
         # Two-step style selection
         style_category = st.selectbox(
@@ -345,6 +382,13 @@ with st.sidebar:
 
     st.divider()
     show_weights = st.checkbox("Show Advanced Weights ⚖️", value=True, key="show_weights", help="Enable weight sliders for image fusion.")
+    dedup_settings = settings.get('dedup', {})
+    skip_duplicates = st.checkbox(
+        "Skip Near-Duplicate Frames 🧹",
+        value=dedup_settings.get('enabled', True),
+        key="skip_duplicates",
+        help="Drop visually identical frames (perceptual hash) before sending them to the model."
+    )
         
 
     
@@ -405,49 +449,42 @@ else:  # Video + Images (Mix)
 
 # Handle Images Only mode
 if uploaded_images and not uploaded_file:
-    from PIL import Image
-    
-    # Load images
-    all_frames = []
-    for img_file in uploaded_images:
-        img = Image.open(img_file)
-        all_frames.append(img)
-    
-    # Store in session state
     # Detect if new images were uploaded by comparing names
     current_names = [img_file.name for img_file in uploaded_images]
-    previous_names = st.session_state.get('image_names', [])
+    previous_names = st.session_state.get('cached_img_names', [])
+    num_video_frames = frame_store.count('video')
     
     if current_names != previous_names:
         # New upload detected
         previous_count = len(previous_names)
         current_count = len(current_names)
         
-        st.session_state['uploaded_images_list'] = all_frames
-        st.session_state['image_names'] = current_names
-        
-        # ALSO populate cached_images for the unified analysis section
-        st.session_state['cached_images'] = all_frames
+        # Keep the uploaded files' own (compressed) bytes, decoded lazily when needed
+        frame_store.clear('image')
+        for img_file in uploaded_images:
+            frame_store.add_bytes(img_file.getvalue(), source='image', label=img_file.name)
         st.session_state['cached_img_names'] = current_names
         
         # Smart selection: only select NEW images, preserve existing selections
         if current_count > previous_count:
             # New images added - select only the new ones
-            for i in range(previous_count, current_count):
+            for i in range(num_video_frames + previous_count, num_video_frames + current_count):
                 st.session_state[f"frame_select_{i}"] = True
         else:
             # Complete replacement - select all
-            for i in range(current_count):
+            for i in range(num_video_frames, num_video_frames + current_count):
                 if f"frame_select_{i}" not in st.session_state:
                     st.session_state[f"frame_select_{i}"] = True
     
     # Display images with selection controls
-    st.subheader(f"📷 {len(st.session_state['uploaded_images_list'])} Image(s) Uploaded")
+    image_keys = frame_store.keys('image')
+    st.subheader(f"📷 {len(image_keys)} Image(s) Uploaded")
     cols = st.columns(4)
     
-    for i, img in enumerate(st.session_state['uploaded_images_list']):
-        with cols[i % 4]:
-            st.image(img, width="stretch")
+    for n, key in enumerate(image_keys):
+        i = num_video_frames + n # Position in the unified selection (video frames come first)
+        with cols[n % 4]:
+            st.image(frame_store.get_bytes(key), width="stretch")
             
             # Checkbox for selection (for analysis)
             st.checkbox(
@@ -487,7 +524,7 @@ if uploaded_images and not uploaded_file:
                 st.caption(f"Focus: {st.session_state.get(f'focus_{i}', 'All Image')}")
             
             # Show filename
-            st.caption(st.session_state['image_names'][i])
+            st.caption(frame_store.entry(key)['label'])
     
         # Removed direct analysis result display
 
@@ -505,7 +542,7 @@ elif uploaded_file:
         # Extraction Settings
         extract_strategy = st.radio(
             "Extraction Method",
-            ["By Interval (Seconds)", "By Count (Total Frames)"],
+            ["By Interval (Seconds)", "By Count (Total Frames)", "By Scene (Shot Changes)"],
             horizontal=True,
             label_visibility="collapsed"
         )
@@ -513,100 +550,113 @@ elif uploaded_file:
         if extract_strategy == "By Interval (Seconds)":
             interval = st.slider("Interval (seconds)", 1, 10, 2)
             max_frames = None
+        elif extract_strategy == "By Scene (Shot Changes)":
+            max_frames = st.slider("Max Shots", 1, 20, 8, help="One representative frame per detected shot.")
+            interval = None
         else:
             max_frames = st.slider("Number of Frames", 1, 20, 5)
             interval = None
         
         if st.button("Extract Frames", type="primary"):
             with st.spinner("Extracting frames..."):
-                processor = VideoProcessor()
+                video_settings = settings.get('video', {})
+                frame_cache = FrameCache(
+                    cache_dir=video_settings.get('cache_dir', '.cache/frames'),
+                    max_size_mb=video_settings.get('cache_max_mb', 512)
+                )
+                processor = VideoProcessor(
+                    cache=frame_cache,
+                    scene_threshold=video_settings.get('scene_threshold', 0.3),
+                    parallel=video_settings.get('parallel', False),
+                    workers=video_settings.get('workers', 0),
+                    max_dimension=video_settings.get('max_dimension')
+                )
                 
                 # Extract frames using process_video
-                strategy_type = "interval" if extract_strategy == "By Interval (Seconds)" else "count"
+                if extract_strategy == "By Interval (Seconds)":
+                    strategy_type = "interval"
+                elif extract_strategy == "By Scene (Shot Changes)":
+                    strategy_type = "scenes"
+                else:
+                    strategy_type = "count"
                 value_param = interval if extract_strategy == "By Interval (Seconds)" else max_frames
                 
-                frames = processor.process_video(
-                    uploaded_file,
-                    strategy=strategy_type,
-                    value=value_param
-                )
+                # Stream frames as they are decoded: show thumbnails progressively and
+                # store each one compressed right away (the decoded frame is not kept)
+                frame_store.clear('video')
+                extracted_count = 0
+                progress_text = st.empty()
+                preview_cols = st.columns(4)
+                for frame in processor.iter_frames(uploaded_file, strategy=strategy_type, value=value_param):
+                    # frame_index is used to re-extract the full-resolution original on save
+                    if frame_store.add_image(frame.image, source='video', frame_index=frame.index, timestamp=frame.timestamp) is None:
+                        break # Memory budget full: later frames would be refused too (warned below)
+                    with preview_cols[extracted_count % 4]:
+                        caption = f"{frame.timestamp:.1f}s" if frame.timestamp is not None else f"Frame {extracted_count + 1}"
+                        st.image(frame.image, caption=caption, width="stretch")
+                    extracted_count += 1
+                    progress_text.caption(f"🎞️ {extracted_count} frame(s) decoded...")
                 
                 # Clear all previous selections
                 keys_to_delete = [key for key in st.session_state.keys() if key.startswith('frame_select_')]
                 for key in keys_to_delete:
                     del st.session_state[key]
                 
-                # Store ONLY video frames (not images yet)
-                st.session_state['video_frames'] = frames
                 st.session_state['frames_just_extracted'] = True
                 
-                st.success(f"✅ Extracted {len(frames)} frame(s) from video")
+                st.success(f"✅ Extracted {extracted_count} frame(s) from video")
                 st.rerun()
     
     with col2:
         # Dynamically merge video frames + uploaded images
-        has_video = 'video_frames' in st.session_state and st.session_state['video_frames']
+        has_video = frame_store.count('video') > 0
         has_images = uploaded_images is not None and len(uploaded_images) > 0
         
         if has_video or has_images:
-            # Start with video frames
-            all_items = []
-            item_labels = []
-            
-            if has_video:
-                for i, frame in enumerate(st.session_state['video_frames']):
-                    all_items.append(frame)
-                    item_labels.append(f"Frame {i+1}")
-            
             # Add uploaded images if any (dynamic)
             if uploaded_images:
-                from PIL import Image
-                import io
-                
-                # Cache images in session_state to avoid re-reading
+                # Keep images in the frame store to avoid re-reading
                 current_img_names = [img.name for img in uploaded_images]
                 previous_img_names = st.session_state.get('cached_img_names', [])
                 
                 if current_img_names != previous_img_names:
-                    # New images uploaded, cache them
+                    # New images uploaded, store their original (compressed) bytes
                     previous_img_count = len(previous_img_names)
                     current_img_count = len(current_img_names)
                     
-                    cached_images = []
+                    frame_store.clear('image')
                     for img_file in uploaded_images:
-                        img_file.seek(0)  # Reset file pointer
-                        img_bytes = img_file.read()
-                        img = Image.open(io.BytesIO(img_bytes))
-                        cached_images.append(img)
-                    st.session_state['cached_images'] = cached_images
+                        frame_store.add_bytes(img_file.getvalue(), source='image', label=img_file.name)
                     st.session_state['cached_img_names'] = current_img_names
                     
                     # Smart selection for new images only
-                    num_video_frames = len(st.session_state.get('video_frames', []))
+                    num_video_frames = frame_store.count('video')
                     if current_img_count > previous_img_count:
                         # New images added - select only the new ones
                         for i in range(num_video_frames + previous_img_count, num_video_frames + current_img_count):
                             st.session_state[f"frame_select_{i}"] = True
-                
-                # Use cached images
-                for i, img in enumerate(st.session_state.get('cached_images', [])):
-                    all_items.append(img)
-                    item_labels.append(f"📷 {current_img_names[i]}")
             
-            st.subheader(f"Select Items to Analyze ({len(all_items)} total)")
+            # Video frames first, then images
+            item_keys = frame_store.keys()
+            item_labels = [
+                f"Frame {i+1}" if frame_store.entry(key)['source'] == 'video' else f"📷 {frame_store.entry(key)['label']}"
+                for i, key in enumerate(item_keys)
+            ]
+            
+            st.subheader(f"Select Items to Analyze ({len(item_keys)} total)")
             if uploaded_images:
-                st.caption(f"🎬 {len(st.session_state['video_frames'])} frames + 📷 {len(uploaded_images)} images")
+                st.caption(f"🎬 {frame_store.count('video')} frames + 📷 {frame_store.count('image')} images")
             
             # Select All / Deselect All buttons
             col_a, col_b = st.columns(2)
             with col_a:
                 if st.button("Select All"):
-                    for i in range(len(all_items)):
+                    for i in range(len(item_keys)):
                         st.session_state[f"frame_select_{i}"] = True
                     st.rerun()
             with col_b:
                 if st.button("Deselect All"):
-                    for i in range(len(all_items)):
+                    for i in range(len(item_keys)):
                         st.session_state[f"frame_select_{i}"] = False
                     st.rerun()
             
@@ -615,16 +665,17 @@ elif uploaded_file:
             
             # Helper to initialize keys if not present (default to False - unselected)
             if 'frames_just_extracted' in st.session_state and st.session_state['frames_just_extracted']:
-                 for i in range(len(all_items)):
+                 for i in range(len(item_keys)):
                         st.session_state[f"frame_select_{i}"] = False
                  st.session_state['frames_just_extracted'] = False
 
 
 
-            for i, item in enumerate(all_items):
+            for i, key in enumerate(item_keys):
                 col = cols[i % 4]
                 with col:
-                    st.image(item, width="stretch")
+                    # Rendered from the compressed bytes: no decode needed for thumbnails
+                    st.image(frame_store.get_bytes(key), width="stretch")
                     # Layout pour Checkbox + Bouton Supprimer
                     c1, c2 = st.columns([0.8, 0.2])
                     with c1:
@@ -635,20 +686,18 @@ elif uploaded_file:
                     with c2:
                         if st.button("🗑️", key=f"del_{i}", help="Remove this image"):
                             # Determine source and delete
-                            num_video_frames = len(st.session_state.get('video_frames', []))
+                            num_video_frames = frame_store.count('video')
+                            frame_store.remove(key)
                             
                             if i < num_video_frames:
                                 # It's a video frame
-                                st.session_state['video_frames'].pop(i)
                                 st.success("Frame removed!")
                             else:
                                 # It's an uploaded image
                                 img_idx = i - num_video_frames
-                                if 'cached_images' in st.session_state:
-                                    st.session_state['cached_images'].pop(img_idx)
-                                    if 'cached_img_names' in st.session_state:
-                                        st.session_state['cached_img_names'].pop(img_idx)
-                                    st.success("Image removed!")
+                                if img_idx < len(st.session_state.get('cached_img_names', [])):
+                                    st.session_state['cached_img_names'].pop(img_idx)
+                                st.success("Image removed!")
                             
                             # Clean up selection state for this index to avoid errors
                             if f"frame_select_{i}" in st.session_state:
@@ -690,48 +739,47 @@ elif uploaded_file:
             st.divider()
             
             # Calculate selected count dynamically for display
-            current_selection_count = sum(1 for i in range(len(all_items)) if st.session_state.get(f"frame_select_{i}", False))
+            current_selection_count = sum(1 for i in range(len(item_keys)) if st.session_state.get(f"frame_select_{i}", False))
             st.caption(f"Selected: {current_selection_count} items")
 
     # Activity Log (Bottom of Sidebar)
     with st.sidebar:
         st.divider()
         st.caption("Activity Log")
-        if 'video_frames' in st.session_state:
-            st.success(f"✅ {len(st.session_state['video_frames'])} frames extracted")
+        if frame_store.count('video'):
+            st.success(f"✅ {frame_store.count('video')} frames extracted")
+        memory = frame_store.memory_usage()
+        st.caption(
+            f"🧠 Frame memory: {memory['total_bytes'] / 1024**2:.1f} / "
+            f"{memory['budget_bytes'] / 1024**2:.0f} MB"
+        )
 
 
 
 # Analysis Section (Shown when frames are selected)
-has_video = 'video_frames' in st.session_state and st.session_state['video_frames']
-has_images = (uploaded_images is not None and len(uploaded_images) > 0) or \
-             ('cached_images' in st.session_state and len(st.session_state['cached_images']) > 0)
+has_video = frame_store.count('video') > 0
+has_images = (uploaded_images is not None and len(uploaded_images) > 0) or frame_store.count('image') > 0
 
 if has_video or has_images:
-    # Rebuild all_items and item_labels dynamically
-    all_items = []
-    item_labels = []
-    
-    if has_video:
-        for i, frame in enumerate(st.session_state['video_frames']):
-            all_items.append(frame)
-            item_labels.append(f"Frame {i+1}")
-    
-    # Use cached images from session_state
-    if 'cached_images' in st.session_state:
-        cached_names = st.session_state.get('cached_img_names', [])
-        for i, img in enumerate(st.session_state['cached_images']):
-            all_items.append(img)
-            name = cached_names[i] if i < len(cached_names) else "Image"
-            item_labels.append(f"📷 {name}")
+    # Rebuild item keys and labels dynamically (video frames first, then images)
+    item_keys = frame_store.keys()
+    item_labels = [
+        f"Frame {i+1}" if frame_store.entry(key)['source'] == 'video' else f"📷 {frame_store.entry(key)['label'] or 'Image'}"
+        for i, key in enumerate(item_keys)
+    ]
     
     # Get selected items
-    selected_indices = [i for i in range(len(all_items)) if st.session_state.get(f"frame_select_{i}", False)]
+    selected_indices = [i for i in range(len(item_keys)) if st.session_state.get(f"frame_select_{i}", False)]
     
     st.divider()
     
     # Debug / Info
     st.caption(f"✅ **{len(selected_indices)} item(s) selected**")
+    if frame_store.dropped():
+        st.warning(
+            f"⚠️ {frame_store.dropped()} frame(s)/image(s) dropped: frame memory budget full "
+            f"(raise frame_store.memory_budget_mb in settings.yaml or extract fewer frames)"
+        )
     
     # Custom Instruction Input
     custom_instruction = st.text_area(
@@ -756,240 +804,311 @@ if has_video or has_images:
             if not selected_indices:
                 st.warning("⚠️ Select items first!")
             else:
-                selected_items = [all_items[i] for i in selected_indices]
+                # Decoded lazily from the frame store
+                selected_items = [frame_store.get(item_keys[i]) for i in selected_indices]
                 
-                # Get Template
-                mode_config = prompts["analysis_modes"][analysis_mode]
-                template_str = mode_config["template"]
+                # Drop near-duplicate frames (keeps indices aligned for weights & focus below)
+                if skip_duplicates and len(selected_items) > 1:
+                    from core.frame_dedup import FrameDeduplicator
+                    from core.image_encoder import ImageEncoder
+                    deduplicator = FrameDeduplicator(
+                        method=dedup_settings.get('method', 'dhash'),
+                        max_distance=dedup_settings.get('max_distance', 5)
+                    )
+                    # Sizes from the request encoder's cache: the kept frames' payloads are reused by the analysis
+                    selected_items, dedup_report = deduplicator.deduplicate(
+                        selected_items, encoder=ImageEncoder.from_settings(settings, analysis_mode)
+                    )
+                    selected_indices = [selected_indices[k] for k in dedup_report['kept_indices']]
+                    
+                    if dedup_report['frames_saved']:
+                        st.caption(
+                            f"🧹 Skipped {dedup_report['frames_saved']} near-duplicate frame(s) "
+                            f"({dedup_report['frames_before']} → {dedup_report['frames_after']}, "
+                            f"-{dedup_report['bytes_saved'] / 1024:.0f} KB payload)"
+                        )
                 
-                # Render Template
-                if analysis_mode == "style_transfer_pro":
-                    from jinja2 import Template
-                    prompt_text = Template(template_str).render(style=selected_style)
-                else:
-                    prompt_text = template_str
+                def build_prompt(mode):
+                    """Full prompt of an analysis mode for the current selection & sidebar settings."""
+                    return prompt_builder.build(PromptRequest(
+                        mode=mode,
+                        style=selected_style,
+                        locked_identity=st.session_state.get('master_identity') if use_locked_identity else None,
+                        image_focus=tuple(
+                            (st.session_state.get(f"weight_{i}", 1.0), st.session_state.get(f"focus_{i}", "All Image"))
+                            for i in selected_indices
+                        ),
+                        alt_pov_looks=tuple(st.session_state.get('alt_pov_selection') or ()),
+                        look_fidelity=st.session_state.get('look_fidelity'),
+                        style_fidelity=st.session_state.get('style_fidelity'),
+                        custom_instruction=custom_instruction or ""
+                    ))
+
+                prompt_text = build_prompt(analysis_mode)
+                if use_locked_identity and st.session_state.get('master_identity'):
+                    st.toast("🧬 Master Identity Injected into Prompt!", icon="🔒")
+
+                # Multi-Run: fan the selection out to every (mode, model) pair
+                run_modes = [analysis_mode] + [m for m in extra_modes if m != analysis_mode]
+                run_models = [selected_model] + [m for m in compare_models if m != selected_model]
                 
-                # --- CHARACTER LOCKING INJECTION & TEMPLATE MODIFICATION ---
-                if use_locked_identity and 'master_identity' in st.session_state and st.session_state['master_identity']:
-                    master_id_json = json.dumps(st.session_state['master_identity'], indent=2)
+                if len(run_modes) * len(run_models) > 1:
+                    from core.analysis_engine import AnalysisEngine, AnalysisJob
+                    from core.image_encoder import ImageEncoder
+                    from core.result_adapter import ResultAdapter, StreamingResultParser
                     
-                    # 1. STRIP JSON INSTRUCTIONS FROM TEMPLATE (Force Skip)
-                    # We remove the mandate to output JSON so the model doesn't get confused.
-                    import re
-                    # Remove "PART 1... JSON" blocks and Schema examples
-                    prompt_text = re.sub(r"### PART 1:.*?```json.*?```", "", prompt_text, flags=re.DOTALL)
-                    prompt_text = re.sub(r"⚠️ \*\*CRITICAL - OUTPUT ORDER:\*\*.*?DO NOT skip the JSON\.", "", prompt_text, flags=re.DOTALL)
+                    jobs = []
+                    for mode in run_modes:
+                        mode_prompt = prompt_text if mode == analysis_mode else build_prompt(mode)
+                        for model_name in run_models:
+                            jobs.append(AnalysisJob(
+                                job_id=f"{mode}@{model_name}",
+                                mode=mode,
+                                model=OllamaAdapter(
+                                    model_name=model_name,
+                                    temperature=temperature,
+                                    encoder=ImageEncoder.from_settings(settings, mode),
+                                    client=ollama_client,
+                                    keep_alive=settings['model'].get('keep_alive')
+                                ),
+                                prompt=mode_prompt,
+                                label=f"{format_mode_name(mode)} · {model_name}"
+                            ))
                     
-                    # 2. INJECT LOCKED IDENTITY
-                    injection_text = f"""
-\n\n═══════════════════════════════════════════════════════════════
-⚠️ **CRITICAL INSTRUCTION: CHARACTER CONSISTENCY LOCK** ⚠️
-═══════════════════════════════════════════════════════════════
-
-You must strictly adhere to the following **MASTER BIOMETRIC DNA** for the subject.
-**DO NOT** re-invent or guess facial features.
-**DO NOT** allow the artistic style to alter the bone structure or key measurements.
-**YOU MUST** apply the requested style (lighting, clothing, mood) onto THIS specific face/body.
-
-**🧬 MASTER IDENTITY DATA (Immutable):**
-```json
-{master_id_json}
-```
-
-**MANDATORY RULES:**
-1. **Face Shape & Features:** Must match the JSON exactly (Eyes, Nose, Mouth, Jaw).
-2. **Body Type:** Must match the JSON somatotype and proportions.
-3. **Skin Details:** Preserve specific marks/texture described in the JSON.
-4. **Style Application:** Apply the style AROUND this identity. Do not morph the identity to fit the style.
-
-⚠️ **OUTPUT INSTRUCTION:**
-**PROCEED DIRECTLY TO THE LOOKS/PROMPTS.**
-**DO NOT** output the JSON block again. It is provided above as reference only.
-
-═══════════════════════════════════════════════════════════════\n\n
-"""
-                    prompt_text = injection_text + prompt_text
-                    st.toast("🧬 Master Identity Injected into Prompt!", icon="🔒")
-                # -----------------------------------
-                
-                # Inject Weights & Focus Info for fusion modes AND biometric modes
-                biometric_modes = ["alt_pov", "ultimate_biome_fashion_icon", "experimental_fashion_lab", "biome_ultra_detailed", "biometric_complete", "deepstack_biometrics"]
-                if "fusion" in analysis_mode.lower() or analysis_mode in biometric_modes:
-                    weights_info = []
-                    has_all_focus = False
-                    has_clothing_focus = False
+                    max_concurrency = analysis_settings.get('max_concurrency', 2)
+                    st.info(f"⚡ Running {len(jobs)} analyses ({max_concurrency} at a time)...")
                     
-                    for idx, real_idx in enumerate(selected_indices):
-                        w = st.session_state.get(f"weight_{real_idx}", 1.0)
-                        focus = st.session_state.get(f"focus_{real_idx}", "All Image")
-                        
-                        if focus == "All Image": has_all_focus = True
-                        if focus == "Clothing": has_clothing_focus = True
-                        
-                        info_parts = []
-                        if w != 1.0:
-                            info_parts.append(f"Weight {w}")
-
-                        # HARDENED FOCUS RULES
-                        if focus == "Character/Face":
-                            focus_instruction = f"(STRICTLY EXTRACT FACE GEOMETRY & IDENTITY. IGNORE BACKGROUND. STOP ANALYSIS BELOW THE NECK. EXTRACT PRECISE HAIR STYLE & TEXTURE)"
-                        elif focus == "Pose/Body":
-                            focus_instruction = f"(STRICTLY EXTRACT POSE & BODY SHAPE. IGNORE FACE IDENTITY. IGNORE CLOTHING TEXTURE/DETAILS)"
-                        elif focus == "Clothing":
-                            focus_instruction = f"(STRICTLY EXTRACT OUTFIT DETAILS/FABRIC. IGNORE FACE. IGNORE POSE. **IGNORE HAIR** - Hair belongs to Face Source!)"
-                        elif focus == "Background":
-                            focus_instruction = f"(STRICTLY EXTRACT ENVIRONMENT. IGNORE SUBJECT)"
-                        elif focus == "All Image":
-                             focus_instruction = "(Extract EVERYTHING: Face, Pose, Clothing, Background)"
+                    # One live panel per job (throttled rendering)
+                    panels = {}
+                    for job, tab in zip(jobs, st.tabs([job.label for job in jobs])):
+                        with tab:
+                            status = st.empty()
+                            status.caption("⏳ Queued...")
+                            panels[job.job_id] = (status, StreamRenderer(
+                                st.empty(),
+                                interval=ui_settings.get('stream_flush_ms', 100) / 1000,
+                                max_pending_chars=ui_settings.get('stream_flush_chars', 2000)
+                            ))
+                    
+                    # Count finished prompts per job while it streams
+                    prompt_streams = {job.job_id: StreamingResultParser() for job in jobs}
+                    
+                    def on_chunk(job, chunk):
+                        status, renderer = panels[job.job_id]
+                        renderer.write(chunk)
+                        if prompt_streams[job.job_id].feed(chunk):
+                            status.caption(f"⏳ Streaming... {len(prompt_streams[job.job_id].prompts)} prompt(s) ready")
+                    
+                    def on_done(result):
+                        status, renderer = panels[result.job.job_id]
+                        renderer.close()
+                        if result.error:
+                            status.error(f"An error occurred: {result.error}")
                         else:
-                            focus_instruction = f"(Focus on {focus})"
-                        
-                        info_parts.append(f"Focus: {focus} {focus_instruction}")
-                        weights_info.append(f"- Image {idx+1}: {', '.join(info_parts)}")
+                            payload = result.payload_report or {}
+                            status.caption(
+                                f"✅ {result.elapsed:.1f}s · {len(result.text)} characters · "
+                                f"{payload.get('bytes', 0) / 1024:.0f} KB payload"
+                            )
+                    
+                    engine = AnalysisEngine(max_concurrency=max_concurrency)
+                    results = engine.run(jobs, selected_items, on_chunk=on_chunk, on_done=on_done)
+                    
+                    # Parse & persist every successful run; the first one drives the main result view
+                    adapter_parser = ResultAdapter()
+                    multi_results = []
+                    for result in results:
+                        if result.error:
+                            continue
+                        entry = {
+                            'parsed': {'prompts': [], 'json_data': None},
+                            'full_response': result.text,
+                            'mode': result.job.mode,
+                            'style': selected_style,
+                            'model': result.job.model.model_name,
+                            'label': result.job.label
+                        }
+                        try:
+                            entry['parsed'] = adapter_parser.parse_response(result.text, result.job.mode)
+                        except Exception as e:
+                            st.error(f"⚠️ Parsing Error ({result.job.label}): {e}")
+                        multi_results.append(entry)
                     
-                    if weights_info:
-                        weight_context = "\n\n**USER ASSIGNED WEIGHTS & FOCUS:**\n" + "\n".join(weights_info) + "\n\n"
-                        priority_rule = """
-**⚡ FUSION PRIORITY PROTOCOL (STRICT IDENTITY):**
-1. For **FACE/HEAD/HAIR** details: Use ONLY the image marked "Focus: Face". **This Focus OVERRIDES strict weights.** If Image 1 is "Face", Face 1 represents the identity.
-2. For **BODY/POSE/CLOTHING** details: Use ONLY images marked "Focus: Pose" or "Focus: Clothing". 
-   **⛔ CRITICAL:** DO NOT use the "Face" image for Body/Clothing description (unless 'All Image' is set).
-"""
-                        prompt_text = weight_context + priority_rule + prompt_text
+                    if multi_results:
+                        st.session_state['multi_results'] = multi_results
+                        st.session_state['current_result'] = multi_results[0]
+                        st.session_state['last_analysis'] = multi_results[0]
+                        get_result_view(multi_results[0], adapter_parser) # Render model built once, reused by reruns
+                        st.toast(f"✅ {len(multi_results)}/{len(jobs)} Analyses Complete!", icon="🎉")
                 
-                # Inject ALT POV Selection
-                if analysis_mode == "alt_pov" and 'alt_pov_selection' in st.session_state and st.session_state['alt_pov_selection']:
-                    selected_looks_str = ", ".join(st.session_state['alt_pov_selection'])
-                    selection_instruction = f"""
-\n🚨 **CRITICAL OVERRIDE - MANDATORY:**
-You MUST generate ONLY the following looks: {selected_looks_str}
-**DO NOT GENERATE** any other looks.
-"""
-                    prompt_text = prompt_text + selection_instruction
-
-                # Inject Look Fidelity
-                if analysis_mode == "alt_pov" and 'look_fidelity' in st.session_state:
-                    fidelity = st.session_state['look_fidelity']
-                    fidelity_instruction = f"""
-\n🎚️ **CREATIVE TRANSFORMATION LEVEL: {100 - fidelity}%**
-(Fidelity set to {fidelity}%)
-
-**INSTRUCTION BASED ON FIDELITY:**
-- **IF FIDELITY IS HIGH (>80%):** You must **PRESERVE the original outfit and environment**. The "Alt POV" should only be a change of camera angle. DO NOT change the clothes.
-- **IF FIDELITY IS MEDIUM (50-80%):** You may slightly modify the outfit (add accessories, change texture) but keep the core theme.
-- **IF FIDELITY IS LOW (<50%):** **FULL TRANSFORMATION ALLOWED.** You can completely change the outfit and scenario to match the requested "Look" (e.g., Latex, Sci-Fi, etc.). **IGNORE original clothes.**
-"""
-                    prompt_text = prompt_text + fidelity_instruction 
-
-                # Inject Aesthetic Fidelity
-                if analysis_mode == "alt_pov" and 'style_fidelity' in st.session_state:
-                    style_fid = st.session_state['style_fidelity']
-                    style_instruction = f"""
-\n🎞️ **AESTHETIC/TEXTURE INSTRUCTION:**
-- **Aesthetic Fidelity: {style_fid}%**
-- IF > 80%: PRESERVE all film grain, noise, blur, and lighting imperfections from the source. Do NOT clean it up.
-- IF < 40%: MODERNIZE the image. Remove noise, sharpen details, use 4K digital aesthetic.
-"""
-                    prompt_text = prompt_text + style_instruction 
-
-                # Inject Custom Instruction
-                if custom_instruction and custom_instruction.strip():
-                    override_text = f"\n\n⚠️ **IMPORTANT USER OVERRIDE / CUSTOM INSTRUCTION:**\n{custom_instruction.strip()}\n(This instruction takes PRIORITY over all previous instructions.)\n"
-                    prompt_text = prompt_text + override_text
-
-                st.info(f"**Prompt:** {prompt_text[:100]}...")
+                else:
+                    st.info(f"**Prompt:** {prompt_text[:100]}...")
                 
-                try:
-                    from core.result_adapter import ResultAdapter
-                    adapter_parser = ResultAdapter()
-                    adapter = OllamaAdapter(model_name=selected_model, temperature=temperature)
+                    try:
+                        from core.result_adapter import ResultAdapter, StreamingJSONScanner, StreamingResultParser
+                        adapter_parser = ResultAdapter()
+                        from core.image_encoder import ImageEncoder
+                        adapter = OllamaAdapter(
+                            model_name=selected_model,
+                            temperature=temperature,
+                            encoder=ImageEncoder.from_settings(settings, analysis_mode),
+                            client=ollama_client,
+                            keep_alive=settings['model'].get('keep_alive')
+                        )
                     
-                    json_placeholder = st.empty() # Placeholder for immediate JSON display
-                    result_container = st.empty()
-                    full_response = ""
-                    json_displayed = False
+                        json_placeholder = st.empty() # Placeholder for immediate JSON display
+                        result_container = st.empty()
+                        json_displayed = False
+                        json_scanner = StreamingJSONScanner()
                     
-                    for chunk in adapter.analyze(selected_items, prompt_text, stream=True):
-                        full_response += chunk
-                        result_container.markdown(full_response + "▌")
+                        # Prompts whose code block is closed, shown while the rest still generates
+                        live_prompts = st.empty()
+                        live_looks = st.empty() # Finished looks of the section still being written (ALT POV)
+                        prompt_stream = StreamingResultParser(adapter_parser)
+                        live_state = {'box': None, 'shown': [], 'widgets': 0, 'look_markers': 0}
                         
-                        # REAL-TIME JSON DETECTION (SIMPLIFIED & ROBUST)
-                        # Show if NO identity is locked OR if user explicitly disabled the lock (wants new DNA)
-                        has_locked_id = 'master_identity' in st.session_state and st.session_state['master_identity']
-                        allow_new_dna = not has_locked_id or not use_locked_identity
+                        def show_live_prompts():
+                            prompts_ready = prompt_stream.prompts
+                            if live_state['shown'] != prompts_ready[:len(live_state['shown'])]:
+                                live_state['box'], live_state['shown'] = None, [] # Sections replaced numbered blocks
+                            if live_state['box'] is None:
+                                live_state['box'] = live_prompts.container()
+                                live_state['box'].markdown("### ⏳ **Prompts ready so far**")
+                            with live_state['box']:
+                                for title, content in prompts_ready[len(live_state['shown']):]:
+                                    live_state['widgets'] += 1
+                                    with st.expander(f"**{title}**", expanded=False):
+                                        st.code(content, language="markdown")
+                                        short_title = "_".join(title.split()[:5]).lower()
+                                        short_title = "".join(c if c.isalnum() or c == "_" else "" for c in short_title)
+                                        st.download_button(
+                                            label="💾 Download",
+                                            data=content,
+                                            file_name=f"{short_title}.txt",
+                                            mime="text/plain",
+                                            key=f"live_dl_{live_state['widgets']}",
+                                            on_click="ignore" # A rerun would stop the generation
+                                        )
+                            live_state['shown'] = prompts_ready
                         
-                        if not json_displayed and allow_new_dna and len(full_response) > 20:
-                            try:
-                                # Find potential JSON block boundaries
-                                start_idx = full_response.find('{')
-                                end_idx = full_response.rfind('}')
-                                
-                                if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
-                                    potential_json = full_response[start_idx : end_idx + 1]
+                        def show_live_looks():
+                            live_state['look_markers'] = len(prompt_stream.look_markers)
+                            looks_ready = prompt_stream.open_looks()
+                            if not looks_ready:
+                                live_looks.empty()
+                                return
+                            with live_looks.container():
+                                st.caption(f"⏳ {len(looks_ready)} look(s) ready in the section being written")
+                                for num, look in looks_ready:
+                                    st.code(look, language="markdown")
+                    
+                        renderer = StreamRenderer(
+                            result_container,
+                            interval=ui_settings.get('stream_flush_ms', 100) / 1000,
+                            max_pending_chars=ui_settings.get('stream_flush_chars', 2000)
+                        )
+                        for chunk in renderer.stream(adapter.analyze(selected_items, prompt_text, stream=True)):
+                            # REAL-TIME JSON DETECTION (incremental: only parses once an object closes)
+                            json_events = json_scanner.feed(chunk)
+                            if prompt_stream.feed(chunk):
+                                show_live_prompts()
+                                show_live_looks() # Their section may just have closed
+                            elif len(prompt_stream.look_markers) != live_state['look_markers']:
+                                show_live_looks()
+                            
+                            # Show if NO identity is locked OR if user explicitly disabled the lock (wants new DNA)
+                            has_locked_id = 'master_identity' in st.session_state and st.session_state['master_identity']
+                            allow_new_dna = not has_locked_id or not use_locked_identity
+                            
+                            if json_events and not json_displayed and allow_new_dna:
+                                parsed_json = json_events[0].data
+                                json_displayed = True
+                                with json_placeholder.container():
+                                    st.divider()
+                                    st.markdown("### 🧬 **Identity DNA Detected**")
+                                    st.caption("👇 **EDITABLE DNA:** You can lock this immediately.")
                                     
-                                    # Attempt to parse
-                                    parsed_json = json.loads(potential_json)
+                                    json_str_live = json.dumps(parsed_json, indent=4)
+                                    edited_json_str_live = st.text_area(
+                                        "Master Identity JSON", 
+                                        value=json_str_live, 
+                                        height=300,
+                                        key="json_editor_area_live",
+                                        help="Modify values here then click LOCK."
+                                    )
                                     
-                                    # If we get here, it's valid JSON!
-                                    json_displayed = True
-                                    with json_placeholder.container():
-                                        st.divider()
-                                        st.markdown("### 🧬 **Identity DNA Detected**")
-                                        st.caption("👇 **EDITABLE DNA:** You can lock this immediately.")
-                                        
-                                        json_str_live = json.dumps(parsed_json, indent=4)
-                                        edited_json_str_live = st.text_area(
-                                            "Master Identity JSON", 
-                                            value=json_str_live, 
-                                            height=300,
-                                            key="json_editor_area_live",
-                                            help="Modify values here then click LOCK."
+                                    col_lock_live, col_info_live = st.columns([1, 2])
+                                    with col_lock_live:
+                                        st.button(
+                                            "🧬 LOCK EDITED DNA", 
+                                            key="btn_save_identity_live", 
+                                            type="primary",
+                                            on_click=lock_identity_callback
                                         )
-                                        
-                                        col_lock_live, col_info_live = st.columns([1, 2])
-                                        with col_lock_live:
-                                            st.button(
-                                                "🧬 LOCK EDITED DNA", 
-                                                key="btn_save_identity_live", 
-                                                type="primary",
-                                                on_click=lock_identity_callback
-                                            )
-                                        with col_info_live:
-                                            st.info("👆 **Click to FREEZE & STOP.**")
-                                        st.divider()
-                            except json.JSONDecodeError:
-                                pass # Not a complete JSON yet, keep waiting
-                            except Exception:
-                                pass # Other errors, ignore
-
-                    # result_container.empty() # DO NOT CLEAR STREAMING OUTPUT
+                                    with col_info_live:
+                                        st.info("👆 **Click to FREEZE & STOP.**")
+                                    st.divider()
+
+                        # result_container.empty() # DO NOT CLEAR STREAMING OUTPUT
+                        full_response = renderer.text
+                        live_prompts.empty() # The full result view below takes over
+                        live_looks.empty()
                     
-                    # Parse response
-                    from core.result_adapter import ResultAdapter
-                    adapter_parser = ResultAdapter()
+                        payload = adapter.last_payload_report
+                        if payload:
+                            st.caption(
+                                f"📦 Request payload: {payload['images']} image(s), {payload['bytes'] / 1024:.0f} KB "
+                                f"({payload['cache_hits']} from cache)"
+                            )
+                        stream_metrics = renderer.metrics()
+                        st.caption(
+                            f"⏱️ Model {stream_metrics['model_seconds']:.1f}s · Render {stream_metrics['render_seconds']:.2f}s "
+                            f"({stream_metrics['renders']} updates for {stream_metrics['chunks']} chunks)"
+                        )
                     
-                    # Secure Save: Save raw data first
-                    st.session_state['current_result'] = {
-                        'parsed': {'prompts': [], 'json_data': None},
-                        'full_response': full_response,
-                        'mode': analysis_mode,
-                        'style': selected_style,
-                        'model': selected_model
-                    }
+                        # Parse response
+                        from core.result_adapter import ResultAdapter
+                        adapter_parser = ResultAdapter()
                     
-                    try:
-                        parsed = adapter_parser.parse_response(full_response, analysis_mode)
-                        st.session_state['current_result']['parsed'] = parsed
-                    except Exception as e:
-                        st.error(f"⚠️ Parsing Error: {e}")
-                        # We still have the raw response in session_state, so fallback will show it.
-
-                    st.session_state['last_analysis'] = st.session_state['current_result']
+                        # Secure Save: Save raw data first
+                        st.session_state.pop('multi_results', None)
+                        st.session_state['current_result'] = {
+                            'parsed': {'prompts': [], 'json_data': None},
+                            'full_response': full_response,
+                            'mode': analysis_mode,
+                            'style': selected_style,
+                            'model': selected_model
+                        }
                     
-                    st.toast("✅ Analysis Complete!", icon="🎉")
+                        try:
+                            parsed = adapter_parser.parse_response(full_response, analysis_mode)
+                            st.session_state['current_result']['parsed'] = parsed
+                        except Exception as e:
+                            st.error(f"⚠️ Parsing Error: {e}")
+                            # We still have the raw response in session_state, so fallback will show it.
+
+                        st.session_state['last_analysis'] = st.session_state['current_result']
+                        get_result_view(st.session_state['current_result'], adapter_parser) # Render model built once, reused by reruns
                     
-                except Exception as e:
-                    st.error(f"An error occurred: {e}")
+                        st.toast("✅ Analysis Complete!", icon="🎉")
+                    
+                    except Exception as e:
+                        st.error(f"An error occurred: {e}")
+
+# --- MULTI-RUN RESULTS ---
+if len(st.session_state.get('multi_results', [])) > 1:
+    multi_results = st.session_state['multi_results']
+    st.divider()
+    st.subheader("⚡ Multi-Run Results")
+    for m_idx, (tab, entry) in enumerate(zip(st.tabs([e['label'] for e in multi_results]), multi_results)):
+        with tab:
+            st.caption(f"Mode: {entry['mode']} | Model: {entry['model']}")
+            if entry['parsed']['prompts']:
+                for title, content in entry['parsed']['prompts']:
+                    with st.expander(f"**{title}**", expanded=False):
+                        st.code(content, language="markdown")
+            else:
+                st.text_area("Raw Output", entry['full_response'], height=400, key=f"multi_raw_{m_idx}")
 
 # --- RENDER RESULTS FROM SESSION STATE ---
 if 'current_result' in st.session_state:
@@ -1047,105 +1166,24 @@ if 'current_result' in st.session_state:
         st.divider()
     # -------------------------------------
 
-    # Display parsed prompts
-    if parsed['prompts']:
+    # Display parsed prompts (order, looks & downloads derived once per result)
+    result_view = get_result_view(res, result_parser)
+    if result_view.prompts:
         st.markdown("### 📋 **COPY-READY PROMPTS**")
         st.caption("💡 Final prompts are shown first (expanded). Intermediate analysis is below (collapsed).")
         
-        # Separate prompts into final and intermediate
-        final_prompts = []
-        intermediate_prompts = []
-        
-        for i, (title, content) in enumerate(parsed['prompts']):
-            title_lower = title.lower()
-            is_final = any(x in title_lower for x in ['unified', 'final', 'reproduction', 'prompt', 'look', 'variant'])
-            is_intermediate = any(x in title_lower for x in ['logic', 'reasoning', 'analysis', 'layer', 'json'])
-            
-            if is_final or (not is_intermediate):
-                final_prompts.append((i, title, content, True))
-            else:
-                intermediate_prompts.append((i, title, content, False))
-        
-        # Display final prompts first, then intermediate
-        all_ordered_prompts = final_prompts + intermediate_prompts
-        
-        if len(parsed['prompts']) <= 2:
-            all_ordered_prompts = [(i, t, c, True) for i, t, c, _ in all_ordered_prompts]
-        
-        for i, title, content, should_expand in all_ordered_prompts:
+        for prompt_view in result_view.ordered:
+            i, title, content = prompt_view.index, prompt_view.title, prompt_view.content
             # SPECIAL DISPLAY FOR ALT_POV (SMART TABS)
-            if analysis_mode == 'alt_pov' and "LOOK 1:" in content:
-                with st.expander(f"**{title} (28 LOOKS - SMART VIEW)**", expanded=should_expand):
+            if prompt_view.looks is not None:
+                with st.expander(f"**{title} (28 LOOKS - SMART VIEW)**", expanded=prompt_view.expanded):
                     st.info("✨ 28 Looks Detected - Organized by Mood")
                     
-                    # Split content into Intro (JSON) and Looks
-                    parts = content.split("**LOOK 1:")
-                    intro = parts[0]
-                    looks_content = "**LOOK 1:" + parts[1] if len(parts) > 1 else content
-                    
                     # Display Intro/JSON first
                     with st.expander("🧬 Biometric Data & Intro", expanded=False):
-                        st.code(intro, language="markdown")
+                        st.code(prompt_view.intro, language="markdown")
 
-                    # Create Tabs
-                    tab_dark, tab_tech, tab_color, tab_light, tab_bonus, tab_fetish = st.tabs([
-                        "🌑 DARK (1-5)", 
-                        "🔌 TECH (6-10)", 
-                        "🌈 COLOR (11-15)", 
-                        "✨ LIGHT (16-20)",
-                        "🔥 BONUS (21-22)",
-                        "💋 FETISH (23-28)"
-                    ])
-                    
-                    # Helper to extract look content
-                    import re
-                    def get_look(text, num):
-                        pattern = f"\\*\\*LOOK {num}:(.*?)(?=\\*\\*LOOK {num+1}:|$)"
-                        match = re.search(pattern, text, re.DOTALL)
-                        return f"**LOOK {num}:{match.group(1)}" if match else ""
-
-                    # Populate Tabs
-                    with tab_dark:
-                        for k in range(1, 6):
-                            lk = get_look(looks_content, k)
-                            if lk: 
-                                st.text_area(f"edit_{i}_{k}", value=lk.strip(), height=150, label_visibility="collapsed")
-                                st.code(lk.strip(), language="markdown")
-                    
-                    with tab_tech:
-                        for k in range(6, 11):
-                            lk = get_look(looks_content, k)
-                            if lk: 
-                                st.text_area(f"edit_{i}_{k}", value=lk.strip(), height=150, label_visibility="collapsed")
-                                st.code(lk.strip(), language="markdown")
-                            
-                    with tab_color:
-                        for k in range(11, 16):
-                            lk = get_look(looks_content, k)
-                            if lk: 
-                                st.text_area(f"edit_{i}_{k}", value=lk.strip(), height=150, label_visibility="collapsed")
-                                st.code(lk.strip(), language="markdown")
-                            
-                    with tab_light:
-                        for k in range(16, 21):
-                            lk = get_look(looks_content, k)
-                            if lk: 
-                                st.text_area(f"edit_{i}_{k}", value=lk.strip(), height=150, label_visibility="collapsed")
-                                st.code(lk.strip(), language="markdown")
-                    
-                    with tab_bonus:
-                        for k in range(21, 23):
-                            lk = get_look(looks_content, k)
-                            if lk: 
-                                st.text_area(f"edit_{i}_{k}", value=lk.strip(), height=150, label_visibility="collapsed")
-                                st.code(lk.strip(), language="markdown")
-                    
-                    with tab_fetish:
-                        for k in range(23, 29):
-                            lk = get_look(looks_content, k)
-                            if lk: 
-                                st.text_area(f"edit_{i}_{k}", value=lk.strip(), height=150, label_visibility="collapsed")
-                                st.code(lk.strip(), language="markdown")
+                    render_look_tabs(content, prompt_view.looks, label_prefix=f"edit_{i}_")
 
                     # Full Text Fallback (hidden by default)
                     with st.expander("📜 View Full Raw Output", expanded=False):
@@ -1153,7 +1191,7 @@ if 'current_result' in st.session_state:
             
             # STANDARD DISPLAY
             else:
-                with st.expander(f"**{title}**", expanded=should_expand):
+                with st.expander(f"**{title}**", expanded=prompt_view.expanded):
                     st.code(content, language="markdown")
                 
                 # Info and download button
@@ -1161,31 +1199,10 @@ if 'current_result' in st.session_state:
                 with col1:
                     st.caption(f"✨ {len(content)} characters")
                 with col2:
-                    import datetime
-                    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    file_timestamp = datetime.datetime.now().strftime("%d%m%Y_%H%M%S")
-                    
-                    title_words = title.split()[:5]
-                    short_title = "_".join(title_words).lower()
-                    short_title = "".join(c if c.isalnum() or c == "_" else "" for c in short_title)
-                    filename = f"{short_title}_{file_timestamp}.txt"
-                    
-                    metadata_footer = f"""
-# ========================================
-# GENERATION INFO
-# ========================================
-# Generated: {timestamp}
-# Analysis Mode: {analysis_mode}
-"""
-                    if selected_style:
-                        metadata_footer += f"# Style: {selected_style}\n"
-                    
-                    metadata_footer += "# ========================================\n"
-                    
                     st.download_button(
                         label="💾 Download",
-                        data=content + metadata_footer,
-                        file_name=filename,
+                        data=prompt_view.download_data,
+                        file_name=prompt_view.filename,
                         mime="text/plain",
                         key=f"dl_btn_{i}"
                     )
@@ -1206,7 +1223,7 @@ if 'current_result' in st.session_state:
                         ref_image = "unknown"
                         if selected_items and isinstance(selected_items[0], str):
                             ref_image = os.path.basename(selected_items[0])
-                        elif 'video_frames' in st.session_state:
+                        elif frame_store.count('video'):
                             ref_image = "video_frame_extraction"
                             
                         final_rating = (rating + 1) if rating is not None else 0
@@ -1229,27 +1246,20 @@ if 'current_result' in st.session_state:
 
     # Display JSON data for biometric modes
     if parsed['json_data']:
-        import datetime
-        ts = datetime.datetime.now().strftime("%d%m%Y%H%M%S")
-        filename = f"biome_ID_{ts}.json"
-        
-        if isinstance(parsed['json_data'], dict):
-            parsed['json_data']["id"] = f"ID_{ts}"
-        
         st.divider()
         st.subheader("🧬 Biometric Data Extracted")
         
         with st.expander("🔍 Inspect Raw JSON Data", expanded=False):
-            st.json(parsed['json_data'])
+            st.json(result_view.json_data)
         
         st.download_button(
-            label=f"📥 Download {filename}",
-            data=json.dumps(parsed['json_data'], indent=4),
-            file_name=filename,
+            label=f"📥 Download {result_view.json_filename}",
+            data=result_view.json_download,
+            file_name=result_view.json_filename,
             mime="application/json",
             type="primary"
         )
-    elif analysis_mode in ["ultimate_biome_fashion_icon", "fetish_mode_shorts", "biome_ultra_detailed"]:
+    elif res['mode'] in ["ultimate_biome_fashion_icon", "fetish_mode_shorts", "biome_ultra_detailed"]:
         st.warning("⚠️ No JSON block found in the response.")
 
     # Display last analysis results (persists across reruns)
@@ -1260,92 +1270,22 @@ if 'current_result' in st.session_state:
         st.subheader("📊 Last Analysis Results")
         st.caption(f"Mode: {last['mode']} | Style: {last.get('style', 'N/A')} | Model: {last['model']}")
         
-        # Display prompts
-        parsed_last = last.get('parsed', {})
-        if parsed_last.get('prompts'):
-            for i, (title, content) in enumerate(parsed_last['prompts']):
-                # Determine if this is a "Final" or "Important" prompt to expand by default
-                title_lower = title.lower()
-                is_final = any(x in title_lower for x in ['unified', 'final', 'reproduction', 'prompt', 'look', 'variant'])
-                is_intermediate = any(x in title_lower for x in ['logic', 'reasoning', 'analysis', 'layer', 'json'])
-                
-                should_expand = is_final or (not is_intermediate)
-                if len(parsed_last['prompts']) <= 2:
-                    should_expand = True
+        # Display prompts (same cached view when it is the current result)
+        last_view = get_result_view(last, result_parser)
+        if last_view.prompts:
+            for prompt_view in last_view.prompts:
+                i, title, content = prompt_view.index, prompt_view.title, prompt_view.content
 
                 # SPECIAL DISPLAY FOR ALT_POV (SMART TABS)
-                if last['mode'] == 'alt_pov' and "LOOK 1:" in content:
-                    with st.expander(f"**{title} (28 LOOKS - SMART VIEW)**", expanded=should_expand):
+                if prompt_view.looks is not None:
+                    with st.expander(f"**{title} (28 LOOKS - SMART VIEW)**", expanded=prompt_view.expanded):
                         st.info("✨ 28 Looks Detected - Organized by Mood")
                         
-                        # Split content into Intro (JSON) and Looks
-                        parts = content.split("**LOOK 1:")
-                        intro = parts[0]
-                        looks_content = "**LOOK 1:" + parts[1] if len(parts) > 1 else content
-                        
                         # Display Intro/JSON first
                         with st.expander("🧬 Biometric Data & Intro", expanded=False):
-                            st.code(intro, language="markdown")
+                            st.code(prompt_view.intro, language="markdown")
 
-                        # Create Tabs
-                        tab_dark, tab_tech, tab_color, tab_light, tab_bonus, tab_fetish = st.tabs([
-                            "🌑 DARK (1-5)", 
-                            "🔌 TECH (6-10)", 
-                            "🌈 COLOR (11-15)", 
-                            "✨ LIGHT (16-20)",
-                            "🔥 BONUS (21-22)",
-                            "💋 FETISH (23-28)"
-                        ])
-                        
-                        # Helper to extract look content
-                        import re
-                        def get_look(text, num):
-                            pattern = f"\\*\\*LOOK {num}:(.*?)(?=\\*\\*LOOK {num+1}:|$)"
-                            match = re.search(pattern, text, re.DOTALL)
-                            return f"**LOOK {num}:{match.group(1)}" if match else ""
-
-                        # Populate Tabs
-                        with tab_dark:
-                            for i in range(1, 6):
-                                lk = get_look(looks_content, i)
-                                if lk: 
-                                    st.text_area(f"edit_{i}", value=lk.strip(), height=150, label_visibility="collapsed")
-                                    st.code(lk.strip(), language="markdown")
-                        
-                        with tab_tech:
-                            for i in range(6, 11):
-                                lk = get_look(looks_content, i)
-                                if lk: 
-                                    st.text_area(f"edit_{i}", value=lk.strip(), height=150, label_visibility="collapsed")
-                                    st.code(lk.strip(), language="markdown")
-                                
-                        with tab_color:
-                            for i in range(11, 16):
-                                lk = get_look(looks_content, i)
-                                if lk: 
-                                    st.text_area(f"edit_{i}", value=lk.strip(), height=150, label_visibility="collapsed")
-                                    st.code(lk.strip(), language="markdown")
-                                
-                        with tab_light:
-                            for i in range(16, 21):
-                                lk = get_look(looks_content, i)
-                                if lk: 
-                                    st.text_area(f"edit_{i}", value=lk.strip(), height=150, label_visibility="collapsed")
-                                    st.code(lk.strip(), language="markdown")
-                        
-                        with tab_bonus:
-                            for i in range(21, 23):
-                                lk = get_look(looks_content, i)
-                                if lk: 
-                                    st.text_area(f"edit_{i}", value=lk.strip(), height=150, label_visibility="collapsed")
-                                    st.code(lk.strip(), language="markdown")
-                        
-                        with tab_fetish:
-                            for i in range(23, 29):
-                                lk = get_look(looks_content, i)
-                                if lk: 
-                                    st.text_area(f"edit_{i}", value=lk.strip(), height=150, label_visibility="collapsed")
-                                    st.code(lk.strip(), language="markdown")
+                        render_look_tabs(content, prompt_view.looks, label_prefix="edit_")
 
                         # Full Text Fallback (hidden by default)
                         with st.expander("📜 View Full Raw Output", expanded=False):
@@ -1353,7 +1293,7 @@ if 'current_result' in st.session_state:
 
                 # STANDARD DISPLAY FOR OTHER MODES
                 else:
-                    with st.expander(f"**{title}**", expanded=should_expand):
+                    with st.expander(f"**{title}**", expanded=prompt_view.expanded):
                         # 1. READABLE VIEW (Wrapped Text)
                         st.caption("📖 **Read / Edit:**")
                         st.text_area(
@@ -1372,31 +1312,10 @@ if 'current_result' in st.session_state:
                     with col1:
                         st.caption(f"✨ {len(content)} characters")
                     with col2:
-                        import datetime
-                        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        file_timestamp = datetime.datetime.now().strftime("%d%m%Y_%H%M%S")
-                        
-                        title_words = title.split()[:5]
-                        short_title = "_".join(title_words).lower()
-                        short_title = "".join(c if c.isalnum() or c == "_" else "" for c in short_title)
-                        filename = f"{short_title}_{file_timestamp}.txt"
-                        
-                        metadata_footer = f"""
-
-# ========================================
-# GENERATION INFO
-# ========================================
-# Generated: {timestamp}
-# Analysis Mode: {last['mode']}
-# ========================================
-"""
-                        
-                        file_content = content + metadata_footer
-                        
                         st.download_button(
                             label="💾 Download .txt",
-                            data=file_content,
-                            file_name=filename,
+                            data=prompt_view.persist_download_data,
+                            file_name=prompt_view.filename,
                             mime="text/plain",
                             key=f"persist_download_{i}",
                             use_container_width=True
@@ -1416,7 +1335,7 @@ if 'current_result' in st.session_state:
                             ref_image = "unknown"
                             if last['items'] and isinstance(last['items'][0], str):
                                 ref_image = os.path.basename(last['items'][0])
-                            elif 'video_frames' in st.session_state:
+                            elif frame_store.count('video'):
                                 ref_image = "video_frame_extraction"
                             
                             final_rating = (rating + 1) if rating is not None else 0
@@ -1468,8 +1387,20 @@ if 'current_result' in st.session_state:
                 save_dir = f"saved_collections/selection_{timestamp}"
                 os.makedirs(save_dir, exist_ok=True)
                 
+                # Video frames are downscaled at decode time: save the full-resolution originals
+                originals = {}
+                video_selection = [i for i in selected_indices if frame_store.entry(item_keys[i])['source'] == 'video']
+                if video_selection and uploaded_file is not None:
+                    try:
+                        original_frames = VideoProcessor().extract_originals(
+                            uploaded_file, [frame_store.entry(item_keys[i])['frame_index'] for i in video_selection]
+                        )
+                        originals = dict(zip(video_selection, original_frames))
+                    except Exception as e:
+                        st.warning(f"⚠️ Could not re-extract full-resolution frames, saving previews: {e}")
+                
                 for i in selected_indices:
-                    item = all_items[i]
+                    item = originals[i] if i in originals else frame_store.get(item_keys[i])
                     label = item_labels[i]
                     safe_label = "".join([c for c in label if c.isalnum() or c in (' ', '.', '_')]).strip()
                     filename = f"{i+1:03d}_{safe_label}.png"
@@ -0,0 +1,122 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from core.interfaces import AIModel
+
+_DONE = object() # Sentinel returned by next() when a stream is exhausted
+
+
+class AnalysisJob(NamedTuple):
+    """One (mode, model) run over the shared frame selection."""
+    job_id: str
+    mode: str
+    model: AIModel
+    prompt: str
+    label: str = ""
+
+
+class AnalysisResult(NamedTuple):
+    job: AnalysisJob
+    text: str
+    error: Optional[Exception] = None
+    elapsed: float = 0.0
+    payload_report: Optional[Dict[str, int]] = None
+
+
+class AnalysisEngine:
+    """
+    Runs several analyses of the same frames concurrently.
+
+    Each job pairs an AIModel with a prompt (typically one job per analysis
+    mode and/or model). Jobs run on an asyncio event loop, at most
+    `max_concurrency` at a time; the blocking model streams are consumed in
+    worker threads and every chunk is handed to `on_chunk` on the calling
+    thread, so UI code can update its own panel per job. Image payloads are
+    encoded once per distinct encoder setting before the fan-out and shared by
+    all jobs through the encoder cache.
+    """
+
+    def __init__(self, max_concurrency: int = 2):
+        """
+        Args:
+            max_concurrency: Max jobs streaming at the same time.
+        """
+        self.max_concurrency = max(1, max_concurrency)
+
+    def run(self, jobs: List[AnalysisJob], frames: List[Any],
+            on_chunk: Optional[Callable[[AnalysisJob, str], None]] = None,
+            on_done: Optional[Callable[[AnalysisResult], None]] = None) -> List[AnalysisResult]:
+        """
+        Runs all jobs and blocks until they finish.
+
+        Args:
+            jobs: Jobs to run.
+            frames: PIL images sent with every job.
+            on_chunk: Called as on_chunk(job, chunk) for each streamed chunk
+                (the full text is in the AnalysisResult passed to on_done).
+            on_done: Called with each AnalysisResult as soon as its job ends.
+
+        Returns:
+            One AnalysisResult per job, in job order. A failing job reports its
+            error and does not stop the others.
+        """
+        return asyncio.run(self.run_async(jobs, frames, on_chunk=on_chunk, on_done=on_done))
+
+    async def run_async(self, jobs: List[AnalysisJob], frames: List[Any],
+                        on_chunk: Optional[Callable[[AnalysisJob, str], None]] = None,
+                        on_done: Optional[Callable[[AnalysisResult], None]] = None) -> List[AnalysisResult]:
+        """Coroutine version of run(), for callers that already own an event loop."""
+        frames = list(frames)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(pool, self._warm_payloads, jobs, frames)
+
+            async def _run_job(job: AnalysisJob) -> AnalysisResult:
+                async with semaphore:
+                    result = await self._stream_job(job, frames, pool, on_chunk)
+                if on_done:
+                    on_done(result)
+                return result
+
+            return list(await asyncio.gather(*(_run_job(job) for job in jobs)))
+
+    async def _stream_job(self, job: AnalysisJob, frames: List[Any], pool: ThreadPoolExecutor,
+                          on_chunk: Optional[Callable[[AnalysisJob, str], None]]) -> AnalysisResult:
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        parts: List[str] = [] # Joined once at the end (no quadratic string concatenation)
+        try:
+            stream = job.model.analyze(frames, job.prompt, stream=True)
+            while True:
+                chunk = await loop.run_in_executor(pool, next, stream, _DONE)
+                if chunk is _DONE:
+                    break
+                parts.append(chunk)
+                if on_chunk:
+                    on_chunk(job, chunk)
+        except Exception as e:
+            return AnalysisResult(job, "".join(parts), error=e, elapsed=time.perf_counter() - start,
+                                  payload_report=getattr(job.model, 'last_payload_report', None))
+        return AnalysisResult(job, "".join(parts), elapsed=time.perf_counter() - start,
+                              payload_report=getattr(job.model, 'last_payload_report', None))
+
+    @staticmethod
+    def _warm_payloads(jobs: List[AnalysisJob], frames: List[Any]):
+        """
+        Encodes the frames once per distinct encoder setting, so concurrent jobs
+        hit the payload cache instead of encoding the same frames in parallel.
+        """
+        seen = set()
+        for job in jobs:
+            encoder = getattr(job.model, 'encoder', None)
+            if encoder is None or encoder.settings_key in seen:
+                continue
+            seen.add(encoder.settings_key)
+            try:
+                encoder.encode(frames)
+            except Exception as e:
+                print(f"⚠️ Payload pre-encoding failed ({job.label or job.job_id}): {e}")
@@ -0,0 +1,250 @@
+import copy
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+
+from PIL import Image
+
+from core.prompt_builder import PromptBuilder, PromptRequest
+from core.result_adapter import ResultAdapter
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv", ".webm", ".m4v")
+
+
+def discover_inputs(patterns: List[str], recursive: bool = True) -> List[str]:
+    """
+    Expands files, directories and glob patterns into a sorted, de-duplicated
+    list of image/video paths.
+    """
+    found = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            walker = os.walk(pattern) if recursive else [(pattern, [], os.listdir(pattern))]
+            for root, _, files in walker:
+                for name in files:
+                    found.add(os.path.join(root, name))
+        else:
+            found.update(glob.glob(pattern, recursive=recursive) or ([pattern] if os.path.isfile(pattern) else []))
+    return sorted(p for p in found if p.lower().endswith(IMAGE_EXTENSIONS + VIDEO_EXTENSIONS))
+
+
+class BatchRunner:
+    """
+    Headless pipeline for large batches of images and videos.
+
+    Each input goes through extraction (videos) -> prompt rendering -> model
+    analysis -> parsing, on a worker pool. Results are appended to a JSONL file
+    as they complete (one record per input) and optionally saved to the
+    history database from the calling thread. The JSONL file doubles as the
+    progress log: re-running the same batch skips inputs that already
+    succeeded with the same settings (rendered prompt, model, temperature,
+    image encoding and, for videos, frame extraction), so an interrupted run
+    resumes where it stopped and a run with different options redoes them.
+    """
+
+    def __init__(self, model, prompts: Dict[str, Any], mode: str, output_path: str,
+                 video_processor=None, strategy: str = "count", strategy_value: Any = 5,
+                 style: Optional[str] = None, custom_instruction: str = "", db=None, workers: int = 2):
+        """
+        Args:
+            model: AIModel used for every input (e.g. OllamaAdapter).
+            prompts: Prompt config (as loaded from prompts.yaml).
+            mode: Analysis mode key.
+            output_path: JSONL file results are appended to.
+            video_processor: VideoProcessor used for video inputs.
+            strategy, strategy_value: Frame extraction strategy for videos ("interval", "count", "scenes").
+            style: Style passed to the template (style_transfer_pro).
+            custom_instruction: Extra instruction appended to every prompt.
+            db: DatabaseManager to save results to (None = JSONL only).
+            workers: Inputs processed concurrently.
+        """
+        if mode not in prompts.get("analysis_modes", {}):
+            raise ValueError(f"Unknown analysis mode: {mode}")
+        self.model = model
+        self.mode = mode
+        self.output_path = output_path
+        self.video_processor = video_processor
+        self.strategy = strategy
+        self.strategy_value = strategy_value
+        self.style = style
+        self.db = db
+        self.workers = max(1, workers)
+        self.parser = ResultAdapter()
+        self.prompt = PromptBuilder(prompts).build(
+            PromptRequest(mode=mode, style=style, custom_instruction=custom_instruction)
+        )
+        self._settings_digests = {kind: self._settings_digest(kind) for kind in ('image', 'video')}
+        self._write_lock = threading.Lock()
+
+    def run(self, inputs: List[str], on_progress=None) -> Dict[str, int]:
+        """
+        Processes every input not already done.
+
+        Args:
+            inputs: Image/video paths.
+            on_progress: Called as on_progress(done, total, record) after each input.
+
+        Returns:
+            Counts: 'total', 'skipped', 'ok', 'failed'.
+        """
+        done_keys = self.completed_keys()
+        pending = [path for path in inputs if self._record_key(path) not in done_keys]
+        stats = {'total': len(inputs), 'skipped': len(inputs) - len(pending), 'ok': 0, 'failed': 0}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool, \
+                open(self.output_path, "a", encoding="utf-8") as out:
+            # Keep a bounded number of inputs in flight: frames of thousands of
+            # files are never all in memory at once
+            if self._has_partial_line():
+                out.write("\n") # Interrupted mid-write: never glue a new record onto it
+            queue = iter(pending)
+            in_flight = set()
+            finished = 0
+            while True:
+                while len(in_flight) < self.workers * 2:
+                    path = next(queue, None)
+                    if path is None:
+                        break
+                    in_flight.add(pool.submit(self.process, path))
+                if not in_flight:
+                    break
+
+                completed, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    record = future.result()
+                    self._write(out, record)
+                    if record['status'] == 'ok' and self.db is not None:
+                        self._save(record)
+                    stats['ok' if record['status'] == 'ok' else 'failed'] += 1
+                    finished += 1
+                    if on_progress:
+                        on_progress(finished, len(pending), record)
+        return stats
+
+    def process(self, path: str) -> Dict[str, Any]:
+        """Runs the full pipeline on one input. Never raises: errors are reported in the record."""
+        start = time.perf_counter()
+        record = {
+            'key': self._record_key(path),
+            'input': path,
+            'kind': self._kind(path),
+            'mode': self.mode,
+            'model': getattr(self.model, 'model_name', type(self.model).__name__),
+            'style': self.style,
+        }
+        try:
+            frames = self._load_frames(path, record['kind'])
+            record['frames'] = len(frames)
+
+            # Shallow copy: shares the client & encoder, but per-request state
+            # (last_payload_report) stays private to this worker
+            model = copy.copy(self.model)
+            response = "".join(model.analyze(frames, self.prompt, stream=True))
+            parsed = self.parser.parse_response(response, self.mode)
+
+            record.update({
+                'status': 'ok',
+                'response': response,
+                'prompts': [list(p) for p in parsed['prompts']],
+                'json_data': parsed['json_data'],
+                'payload': getattr(model, 'last_payload_report', None),
+            })
+        except Exception as e:
+            record.update({'status': 'error', 'error': f"{type(e).__name__}: {e}"})
+        record['elapsed'] = round(time.perf_counter() - start, 3)
+        return record
+
+    def completed_keys(self) -> set:
+        """Keys of inputs that already succeeded according to the output file."""
+        keys = set()
+        if not os.path.exists(self.output_path):
+            return keys
+        with open(self.output_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue # Blank or truncated line from an interrupted run
+                if record.get('status') == 'ok' and record.get('key'):
+                    keys.add(record['key'])
+        return keys
+
+    # --- Internals ---
+
+    def _load_frames(self, path: str, kind: str) -> List[Image.Image]:
+        if kind == 'image':
+            with Image.open(path) as img:
+                img.load()
+                return [img.copy()]
+        if self.video_processor is None:
+            raise ValueError("No video processor configured for video inputs")
+        frames = self.video_processor.process_video(path, self.strategy, self.strategy_value)
+        if not frames:
+            raise ValueError("No frames extracted")
+        return frames
+
+    def _record_key(self, path: str) -> str:
+        """Identifies an input + run settings; a modified file is processed again."""
+        try:
+            stat = os.stat(path)
+            fingerprint = f"{stat.st_size}:{int(stat.st_mtime)}"
+        except OSError:
+            fingerprint = "missing"
+        return (f"{os.path.abspath(path)}|{fingerprint}|{self.mode}|{getattr(self.model, 'model_name', '')}"
+                f"|{self.style or ''}|{self._settings_digests[self._kind(path)]}")
+
+    @staticmethod
+    def _kind(path: str) -> str:
+        return 'video' if path.lower().endswith(VIDEO_EXTENSIONS) else 'image'
+
+    def _settings_digest(self, kind: str) -> str:
+        """Hash of every other option that changes the output for this kind of input."""
+        encoder = getattr(self.model, 'encoder', None)
+        settings = {
+            'prompt': self.prompt, # Mode, style, custom instruction and the prompt templates
+            'temperature': getattr(self.model, 'temperature', None),
+            'encoder': encoder.settings_key if encoder is not None else None,
+        }
+        if kind == 'video':
+            settings['extraction'] = {
+                'strategy': self.strategy,
+                'value': self.strategy_value,
+                'max_dimension': getattr(self.video_processor, 'max_dimension', None),
+                'scene_threshold': getattr(self.video_processor, 'scene_threshold', None) if self.strategy == "scenes" else None,
+            }
+        payload = json.dumps(settings, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+    def _has_partial_line(self) -> bool:
+        try:
+            with open(self.output_path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() == 0:
+                    return False
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) != b"\n"
+        except OSError:
+            return False
+
+    def _save(self, record: Dict[str, Any]):
+        try:
+            self.db.save_analysis(
+                image_name=os.path.basename(record['input']),
+                mode=record['mode'],
+                style=record['style'],
+                model=record['model'],
+                prompt_content=record['response'],
+            )
+        except Exception as e:
+            print(f"⚠️ Could not save {record['input']} to DB: {e}")
+
+    def _write(self, out, record: Dict[str, Any]):
+        with self._write_lock:
+            out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            out.flush()
@@ -1,70 +1,128 @@
 import sqlite3
 import datetime
 import os
+import threading
 from typing import List, Dict, Optional
 
+# One connection per (thread, database file), reused by every DatabaseManager of that thread
+_LOCAL = threading.local()
+# Database files whose schema is known to be up to date in this process
+_MIGRATED = set()
+_MIGRATE_LOCK = threading.Lock()
+
+
+def _migrate_v1(cursor: sqlite3.Cursor):
+    """Analyses table with rating and comment (also upgrades tables created before those columns)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS analyses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            image_name TEXT,
+            mode TEXT,
+            style TEXT,
+            model TEXT,
+            prompt_content TEXT,
+            rating INTEGER DEFAULT 0,
+            comment TEXT DEFAULT ""
+        )
+    ''')
+    columns = {row[1] for row in cursor.execute('PRAGMA table_info(analyses)')}
+    if 'rating' not in columns:
+        cursor.execute('ALTER TABLE analyses ADD COLUMN rating INTEGER DEFAULT 0')
+    if 'comment' not in columns:
+        cursor.execute('ALTER TABLE analyses ADD COLUMN comment TEXT DEFAULT ""')
+
+
+# Schema migrations, in order. PRAGMA user_version holds how many were applied:
+# add new ones at the end, never edit an applied one.
+MIGRATIONS = [
+    _migrate_v1,
+]
+
+
 class DatabaseManager:
-    def __init__(self, db_path: str = "history.db"):
-        """Initialize the database manager with a file path."""
+    """
+    History of analyses (SQLite).
+
+    Connections are pooled per thread and per file instead of opened for each
+    call, in WAL mode (readers never block the writer) with synchronous=NORMAL
+    and a busy timeout, so concurrent Streamlit sessions wait for the lock
+    instead of failing with "database is locked". The schema version is kept
+    in PRAGMA user_version: migrations run once, and only those not applied yet.
+    """
+
+    def __init__(self, db_path: str = "history.db", busy_timeout: float = 5.0):
+        """
+        Initialize the database manager with a file path.
+
+        Args:
+            db_path: SQLite file.
+            busy_timeout: Seconds to wait for a lock held by another connection.
+        """
         self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self._key = os.path.abspath(db_path)
         self._init_db()
 
-    def _get_connection(self):
-        """Create a database connection."""
-        return sqlite3.connect(self.db_path)
+    def _get_connection(self) -> sqlite3.Connection:
+        """This thread's connection to the database (created on first use)."""
+        connections = getattr(_LOCAL, "connections", None)
+        if connections is None:
+            connections = _LOCAL.connections = {}
+        conn = connections.get(self._key)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            connections[self._key] = conn
+        return conn
+
+    def close(self):
+        """Closes this thread's connection (the next call reopens one)."""
+        conn = getattr(_LOCAL, "connections", {}).pop(self._key, None)
+        if conn is not None:
+            conn.close()
 
     def _init_db(self):
-        """Create the necessary tables if they don't exist."""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        # Create analyses table with rating and comment
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS analyses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                image_name TEXT,
-                mode TEXT,
-                style TEXT,
-                model TEXT,
-                prompt_content TEXT,
-                rating INTEGER DEFAULT 0,
-                comment TEXT DEFAULT ""
-            )
-        ''')
-        
-        # Migration: Check if columns exist (in case DB was already created without them)
-        try:
-            cursor.execute('ALTER TABLE analyses ADD COLUMN rating INTEGER DEFAULT 0')
-        except sqlite3.OperationalError:
-            pass # Column likely exists
-            
-        try:
-            cursor.execute('ALTER TABLE analyses ADD COLUMN comment TEXT DEFAULT ""')
-        except sqlite3.OperationalError:
-            pass # Column likely exists
-        
-        conn.commit()
-        conn.close()
-
-    def save_analysis(self, image_name: str, mode: str, prompt_content: str, 
+        """Brings the schema up to date (once per process and file)."""
+        if self._key in _MIGRATED:
+            return
+        with _MIGRATE_LOCK:
+            if self._key in _MIGRATED:
+                return
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            # Write lock first, so two processes never run the same migration
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                version = cursor.execute('PRAGMA user_version').fetchone()[0]
+                for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+                    migration(cursor)
+                    cursor.execute(f'PRAGMA user_version = {number}')
+                    print(f"🗄️ Database migrated to schema v{number}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            _MIGRATED.add(self._key)
+
+    def save_analysis(self, image_name: str, mode: str, prompt_content: str,
                      style: Optional[str] = None, model: str = "Unknown",
                      rating: int = 0, comment: str = ""):
         """
         Save a new analysis result to the database with user feedback.
         """
         conn = self._get_connection()
-        cursor = conn.cursor()
-        
+
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        cursor.execute('''
-            INSERT INTO analyses (timestamp, image_name, mode, style, model, prompt_content, rating, comment)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (timestamp, image_name, mode, style, model, prompt_content, rating, comment))
-        
-        conn.commit()
-        conn.close()
+
+        with conn: # Commits, or rolls back on error
+            conn.execute('''
+                INSERT INTO analyses (timestamp, image_name, mode, style, model, prompt_content, rating, comment)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (timestamp, image_name, mode, style, model, prompt_content, rating, comment))
+
         print(f"✅ Analysis saved to DB: {image_name} (Rating: {rating}/5)")
 
     def get_history(self, limit: int = 50) -> List[Dict]:
@@ -72,33 +130,22 @@ class DatabaseManager:
         Retrieve the most recent analyses.
         """
         conn = self._get_connection()
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT * FROM analyses 
-            ORDER BY id DESC 
+
+        rows = conn.execute('''
+            SELECT * FROM analyses
+            ORDER BY id DESC
             LIMIT ?
-        ''', (limit,))
-        
-        rows = cursor.fetchall()
-        conn.close()
-        
-        history = []
-        for row in rows:
-            history.append(dict(row))
-            
-        return history
+        ''', (limit,)).fetchall()
+
+        return [dict(row) for row in rows]
 
     def delete_analysis(self, analysis_id: int):
         """
         Delete a specific analysis by ID.
         """
         conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM analyses WHERE id = ?', (analysis_id,))
-        
-        conn.commit()
-        conn.close()
+
+        with conn:
+            conn.execute('DELETE FROM analyses WHERE id = ?', (analysis_id,))
+
         print(f"🗑️ Deleted analysis ID: {analysis_id}")
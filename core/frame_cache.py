@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+# Content digests already computed in this process, keyed by (path, size, mtime).
+# Module-level so it survives Streamlit reruns.
+_DIGEST_MEMO: Dict[Tuple[str, int, float], str] = {}
+_DIGEST_LOCK = threading.Lock()
+
+MANIFEST_NAME = "manifest.json"
+
+
+class FrameCache:
+    """
+    Content-addressed on-disk cache of extracted video frames.
+
+    Entries are keyed by a hash of the video content plus the extraction
+    parameters (strategy, value, ...), so the same footage re-extracted with the
+    same settings is served from disk without decoding, across reruns and
+    app restarts. Frames are stored as compressed images; the least recently
+    used entries are evicted once the cache exceeds its size cap.
+    """
+    HASH_CHUNK_SIZE = 8 * 1024 * 1024
+
+    def __init__(self, cache_dir: str = ".cache/frames", max_size_mb: float = 512,
+                 image_format: str = "JPEG", quality: int = 95):
+        """
+        Args:
+            cache_dir: Directory where entries are stored (one sub-directory per entry).
+            max_size_mb: Total size cap; older entries are evicted beyond it.
+            image_format: Pillow format used to store frames ("JPEG", "WEBP", "PNG").
+            quality: Encoder quality for lossy formats.
+        """
+        self.cache_dir = cache_dir
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.image_format = image_format.upper()
+        self.quality = quality
+        self._extension = ".jpg" if self.image_format == "JPEG" else f".{self.image_format.lower()}"
+
+    def video_digest(self, video_path: str) -> str:
+        """
+        Returns the SHA-256 of the video file content.
+        Memoized per (path, size, mtime) so a file is only hashed once per process.
+        """
+        stat = os.stat(video_path)
+        memo_key = (os.path.abspath(video_path), stat.st_size, stat.st_mtime)
+
+        with _DIGEST_LOCK:
+            digest = _DIGEST_MEMO.get(memo_key)
+        if digest:
+            return digest
+
+        sha = hashlib.sha256()
+        with open(video_path, "rb") as f:
+            for chunk in iter(lambda: f.read(self.HASH_CHUNK_SIZE), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+
+        with _DIGEST_LOCK:
+            _DIGEST_MEMO[memo_key] = digest
+        return digest
+
+    def make_key(self, video_digest: str, **params: Any) -> str:
+        """Builds the entry key from the video digest and the extraction parameters."""
+        payload = json.dumps({"video": video_digest, **params}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[Image.Image]]:
+        """
+        Returns the cached frames for a key, or None on a miss.
+        """
+        entry = self.load(key)
+        return entry[0] if entry is not None else None
+
+    def load(self, key: str) -> Optional[Tuple[List[Image.Image], Dict[str, Any]]]:
+        """
+        Returns (frames, metadata) for a key, or None on a miss.
+        """
+        entry_dir = os.path.join(self.cache_dir, key)
+        manifest_path = os.path.join(entry_dir, MANIFEST_NAME)
+
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+
+            frames = []
+            for filename in manifest["frames"]:
+                with Image.open(os.path.join(entry_dir, filename)) as img:
+                    img.load()
+                    frames.append(img.copy())
+        except (OSError, ValueError, KeyError):
+            return None # Missing, partially written or evicted concurrently
+
+        # Touch the manifest: its mtime is the LRU timestamp
+        try:
+            os.utime(manifest_path)
+        except OSError:
+            pass
+
+        return frames, manifest.get("metadata", {})
+
+    def put(self, key: str, frames: List[Image.Image], metadata: Optional[Dict[str, Any]] = None):
+        """
+        Stores frames under a key, then evicts old entries if over the size cap.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry_dir = os.path.join(self.cache_dir, key)
+
+        # Write into a staging directory and rename it, so readers never see half an entry
+        staging_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix=".staging_")
+        try:
+            filenames = []
+            for i, frame in enumerate(frames):
+                filename = f"{i:04d}{self._extension}"
+                self._save_frame(frame, os.path.join(staging_dir, filename))
+                filenames.append(filename)
+
+            manifest = {"frames": filenames, "metadata": metadata or {}}
+            with open(os.path.join(staging_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+
+            if os.path.exists(entry_dir):
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(staging_dir, entry_dir)
+        except OSError:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+
+        self.evict()
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits its size cap."""
+        if not os.path.isdir(self.cache_dir):
+            return
+
+        entries = []
+        total_size = 0
+        for entry in os.scandir(self.cache_dir):
+            if not entry.is_dir() or entry.name.startswith("."):
+                continue
+            size = 0
+            for f in os.scandir(entry.path):
+                try:
+                    size += f.stat().st_size
+                except OSError:
+                    pass
+            try:
+                last_used = os.stat(os.path.join(entry.path, MANIFEST_NAME)).st_mtime
+            except OSError:
+                last_used = 0 # Broken entry: evict first
+            entries.append((last_used, size, entry.path))
+            total_size += size
+
+        for last_used, size, path in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total_size -= size
+
+    def clear(self):
+        """Removes every cached entry."""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _save_frame(self, frame: Image.Image, path: str):
+        if self.image_format == "JPEG" and frame.mode != "RGB":
+            frame = frame.convert("RGB")
+        if self.image_format == "PNG":
+            frame.save(path, format="PNG")
+        else:
+            frame.save(path, format=self.image_format, quality=self.quality)
@@ -0,0 +1,130 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from core.image_encoder import ImageEncoder
+
+
+class FrameDeduplicator:
+    """
+    Detects near-duplicate frames with perceptual hashes before they are sent
+    to the model. Interval extraction on a static shot often yields visually
+    identical frames that only add payload and tokens.
+
+    Supported hashes (all computed with NumPy on small grayscale thumbnails):
+    - "ahash": average hash (pixel > mean)
+    - "dhash": difference hash (pixel > right neighbour), the default
+    - "phash": DCT hash (low frequencies > median)
+    """
+    METHODS = ("ahash", "dhash", "phash")
+
+    def __init__(self, method: str = "dhash", max_distance: int = 5, hash_size: int = 8):
+        """
+        Args:
+            method: Hash algorithm ("ahash", "dhash" or "phash").
+            max_distance: Frames whose Hamming distance to an already kept frame
+                is <= this value are considered duplicates.
+            hash_size: Side of the hash grid (hash_size**2 bits).
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown hash method: {method} (expected one of {', '.join(self.METHODS)})")
+        self.method = method
+        self.max_distance = max_distance
+        self.hash_size = hash_size
+
+    def compute_hashes(self, frames: List[Image.Image]) -> np.ndarray:
+        """
+        Returns a (N, hash_size**2) boolean array, one hash per frame.
+        """
+        n = self.hash_size
+        if self.method == "dhash":
+            size = (n + 1, n)
+        elif self.method == "phash":
+            size = (n * 4, n * 4)
+        else:
+            size = (n, n)
+
+        pixels = np.stack([
+            np.asarray(frame.convert("L").resize(size, Image.Resampling.LANCZOS), dtype=np.float32)
+            for frame in frames
+        ]) # (N, H, W)
+
+        if self.method == "dhash":
+            bits = pixels[:, :, 1:] > pixels[:, :, :-1]
+        elif self.method == "phash":
+            dct = self._dct_matrix(size[0])
+            coeffs = dct @ pixels @ dct.T # 2D DCT of every frame at once
+            low = coeffs[:, :n, :n].reshape(len(frames), -1)
+            # Median excluding the DC term, which only reflects overall brightness
+            median = np.median(low[:, 1:], axis=1, keepdims=True)
+            bits = low > median
+        else:
+            bits = pixels > pixels.mean(axis=(1, 2), keepdims=True)
+
+        return bits.reshape(len(frames), -1)
+
+    def deduplicate(self, frames: List[Image.Image], drop: bool = True,
+                    encoder: Optional[ImageEncoder] = None) -> Tuple[List[Image.Image], Dict[str, Any]]:
+        """
+        Finds near-duplicates, keeping the first occurrence of each.
+
+        Args:
+            frames: PIL Images in analysis order.
+            drop: If True, duplicates are removed from the returned list.
+                If False, all frames are returned and duplicates are only flagged in the report.
+            encoder: Encoder of the request the frames are sent with (default
+                settings if None). Payload sizes come from its shared cache, so
+                the kept frames are not encoded again when the request is sent.
+
+        Returns:
+            (frames, report) where report contains:
+                'kept_indices': indices (in the input list) of the frames kept,
+                'duplicates': [(index, duplicate_of_index, distance), ...],
+                'frames_before' / 'frames_after' / 'frames_saved',
+                'bytes_before' / 'bytes_after' / 'bytes_saved' (request payload)
+        """
+        report: Dict[str, Any] = {
+            'kept_indices': list(range(len(frames))),
+            'duplicates': [],
+            'frames_before': len(frames),
+            'frames_after': len(frames),
+            'frames_saved': 0,
+        }
+
+        if len(frames) > 1:
+            hashes = self.compute_hashes(frames)
+            # Pairwise Hamming distances in one shot (N is small: the user's selection)
+            distances = (hashes[:, None, :] != hashes[None, :, :]).sum(axis=2)
+
+            kept: List[int] = []
+            for i in range(len(frames)):
+                if kept:
+                    nearest = kept[int(np.argmin(distances[i, kept]))]
+                    if distances[i, nearest] <= self.max_distance:
+                        report['duplicates'].append((i, nearest, int(distances[i, nearest])))
+                        continue
+                kept.append(i)
+
+            report['kept_indices'] = kept
+            report['frames_after'] = len(kept)
+            report['frames_saved'] = len(frames) - len(kept)
+
+        payloads, _ = (encoder or ImageEncoder()).encode(frames)
+        sizes = [len(payload) for payload in payloads]
+        report['bytes_before'] = sum(sizes)
+        report['bytes_after'] = sum(sizes[i] for i in report['kept_indices'])
+        report['bytes_saved'] = report['bytes_before'] - report['bytes_after']
+
+        if drop:
+            frames = [frames[i] for i in report['kept_indices']]
+
+        return frames, report
+
+    def _dct_matrix(self, size: int) -> np.ndarray:
+        """Orthonormal DCT-II basis, so a 2D DCT is two matrix products."""
+        k = np.arange(size)[:, None]
+        x = np.arange(size)[None, :]
+        matrix = np.cos(np.pi * (2 * x + 1) * k / (2 * size)) * np.sqrt(2.0 / size)
+        matrix[0] /= np.sqrt(2.0)
+        return matrix.astype(np.float32)
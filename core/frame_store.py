@@ -0,0 +1,220 @@
+import io
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from PIL import Image
+
+
+class FrameStore:
+    """
+    Per-session store for the frames and images the user works with.
+
+    Every frame is held exactly once, compressed in the store's format (JPEG/WebP):
+    decoded video frames are encoded, uploads are recompressed unless their own
+    file is already smaller. Callers get lazily decoded PIL views on demand;
+    decoded views are cached in an LRU that is trimmed to keep the session
+    within its memory budget. Compressed entries count against the same budget:
+    once views are evicted, an entry that does not fit is refused (see dropped()),
+    so frames already shown keep their position. The UI can render thumbnails
+    straight from the compressed bytes without decoding.
+
+    Entries belong to a source ("video" or "image") and are always listed
+    video frames first, then images, in insertion order.
+    """
+    SOURCES = ("video", "image")
+
+    def __init__(self, memory_budget_mb: float = 256, image_format: str = "JPEG", quality: int = 92):
+        """
+        Args:
+            memory_budget_mb: Max memory for this session (compressed frames +
+                decoded views). Decoded views are evicted first when exceeded,
+                then new frames are refused.
+            image_format: Pillow format used to compress decoded frames ("JPEG" or "WEBP").
+            quality: Encoder quality.
+        """
+        self.memory_budget_bytes = int(memory_budget_mb * 1024 * 1024)
+        self.image_format = image_format.upper()
+        self.quality = quality
+
+        self._entries: Dict[str, "OrderedDict[str, Dict[str, Any]]"] = {source: OrderedDict() for source in self.SOURCES}
+        self._views: "OrderedDict[str, Image.Image]" = OrderedDict() # key -> decoded image (LRU)
+        self._view_bytes: Dict[str, int] = {}
+        self._compressed_bytes = 0
+        self._dropped: Dict[str, int] = {source: 0 for source in self.SOURCES} # Refused over budget
+        self._counter = itertools.count()
+        self._lock = threading.RLock()
+
+    # --- Adding & removing ---
+
+    def add_image(self, image: Image.Image, source: str = "video", label: str = "",
+                  **metadata: Any) -> Optional[str]:
+        """
+        Compresses and stores a decoded image.
+        Extra keyword arguments (e.g. frame_index, timestamp) are kept as entry metadata.
+
+        Returns:
+            Its key, or None if it does not fit in the memory budget.
+        """
+        return self._add(self._compress(image), source, label, image.size, metadata)
+
+    def add_bytes(self, data: bytes, source: str = "image", label: str = "",
+                  **metadata: Any) -> Optional[str]:
+        """
+        Stores an encoded image file (e.g. an upload), recompressed to the
+        store's format and quality unless the original file is already smaller.
+
+        Returns:
+            Its key, or None if it does not fit in the memory budget.
+        """
+        with Image.open(io.BytesIO(data)) as img:
+            size = img.size
+            original_format = img.format
+            compressed = self._compress(img)
+        if original_format == self.image_format and len(data) <= len(compressed):
+            compressed = data
+        return self._add(compressed, source, label, size, metadata)
+
+    def remove(self, key: str):
+        """Removes an entry and its decoded view."""
+        with self._lock:
+            for entries in self._entries.values():
+                entry = entries.pop(key, None)
+                if entry is not None:
+                    self._compressed_bytes -= len(entry["data"])
+            self._drop_view(key)
+
+    def clear(self, source: Optional[str] = None):
+        """Removes all entries of a source (or everything)."""
+        with self._lock:
+            for src in ([source] if source else self.SOURCES):
+                for key, entry in self._entries[src].items():
+                    self._compressed_bytes -= len(entry["data"])
+                    self._drop_view(key)
+                self._entries[src].clear()
+                self._dropped[src] = 0
+
+    # --- Reading ---
+
+    def keys(self, source: Optional[str] = None) -> List[str]:
+        """Entry keys, video frames first then images (or only the given source)."""
+        with self._lock:
+            sources = [source] if source else self.SOURCES
+            return [key for src in sources for key in self._entries[src]]
+
+    def entry(self, key: str) -> Dict[str, Any]:
+        """Entry metadata: key, source, label, size (w, h), nbytes and any extra metadata."""
+        with self._lock:
+            for entries in self._entries.values():
+                if key in entries:
+                    return {k: v for k, v in entries[key].items() if k != "data"}
+        raise KeyError(key)
+
+    def get_bytes(self, key: str) -> bytes:
+        """Compressed bytes of an entry (suitable for st.image without decoding)."""
+        return self._find(key)["data"]
+
+    def get(self, key: str) -> Image.Image:
+        """
+        Returns a decoded PIL view of an entry. Views are cached (LRU) within
+        the memory budget; treat them as read-only.
+        """
+        with self._lock:
+            view = self._views.get(key)
+            if view is not None:
+                self._views.move_to_end(key)
+                return view
+
+        data = self._find(key)["data"]
+        view = Image.open(io.BytesIO(data))
+        view.load()
+
+        with self._lock:
+            self._views[key] = view
+            self._view_bytes[key] = view.width * view.height * len(view.getbands())
+            self._enforce_budget(keep=key)
+        return view
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(entries) for entries in self._entries.values())
+
+    def count(self, source: str) -> int:
+        with self._lock:
+            return len(self._entries[source])
+
+    def dropped(self, source: Optional[str] = None) -> int:
+        """Frames refused because the budget was full, since the source was last cleared."""
+        with self._lock:
+            return sum(self._dropped[src] for src in ([source] if source else self.SOURCES))
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Bytes used by compressed frames and decoded views, and the budget."""
+        with self._lock:
+            compressed = self._compressed_bytes
+            decoded = sum(self._view_bytes.values())
+        return {
+            'compressed_bytes': compressed,
+            'decoded_bytes': decoded,
+            'total_bytes': compressed + decoded,
+            'budget_bytes': self.memory_budget_bytes,
+        }
+
+    # --- Internals ---
+
+    def _compress(self, image: Image.Image) -> bytes:
+        if image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info):
+            # Flatten on white, as ImageEncoder does (the store format has no alpha)
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.split()[-1])
+            image = background
+        elif image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, format=self.image_format, quality=self.quality)
+        return buffer.getvalue()
+
+    def _add(self, data: bytes, source: str, label: str, size, metadata: Dict[str, Any]) -> Optional[str]:
+        if source not in self.SOURCES:
+            raise ValueError(f"Unknown source: {source} (expected one of {', '.join(self.SOURCES)})")
+        with self._lock:
+            self._enforce_budget(incoming=len(data))
+            if self._compressed_bytes + sum(self._view_bytes.values()) + len(data) > self.memory_budget_bytes:
+                self._dropped[source] += 1
+                return None
+            key = f"{source}_{next(self._counter)}"
+            self._entries[source][key] = {
+                'key': key,
+                'source': source,
+                'label': label,
+                'size': size,
+                'nbytes': len(data),
+                'data': data,
+                **metadata,
+            }
+            self._compressed_bytes += len(data)
+        return key
+
+    def _find(self, key: str) -> Dict[str, Any]:
+        with self._lock:
+            for entries in self._entries.values():
+                if key in entries:
+                    return entries[key]
+        raise KeyError(key)
+
+    def _drop_view(self, key: str):
+        self._views.pop(key, None)
+        self._view_bytes.pop(key, None)
+
+    def _enforce_budget(self, keep: Optional[str] = None, incoming: int = 0):
+        """Evicts least recently used decoded views until the session (plus `incoming` bytes) fits its budget."""
+        decoded = sum(self._view_bytes.values())
+        for key in list(self._views):
+            if self._compressed_bytes + incoming + decoded <= self.memory_budget_bytes:
+                break
+            if key == keep:
+                continue
+            decoded -= self._view_bytes.get(key, 0)
+            self._drop_view(key)
@@ -0,0 +1,194 @@
+import hashlib
+import io
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from PIL import Image
+
+# Encoded payload cache shared by all encoders (and Streamlit sessions) of this process.
+# Key: (image content digest, encoder settings) -> bytes, evicted least recently used first.
+ENCODE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+_ENCODE_CACHE: "OrderedDict[tuple, bytes]" = OrderedDict()
+_ENCODE_CACHE_SIZE = 0
+_ENCODE_CACHE_LOCK = threading.Lock()
+
+# Content digests of live images, keyed by id() (PIL images are unhashable).
+# The weakref drops the entry when the image is garbage collected, so a reused id() never hits.
+_DIGESTS: dict = {}
+_DIGESTS_LOCK = threading.Lock()
+
+
+def image_digest(image: Image.Image) -> str:
+    """
+    Returns a content hash of a PIL image. Memoized per image object, so the
+    same frame passed to several analyses is only hashed once.
+    """
+    key = id(image)
+    with _DIGESTS_LOCK:
+        memo = _DIGESTS.get(key)
+    if memo is not None and memo[0]() is image:
+        return memo[1]
+
+    sha = hashlib.blake2b(digest_size=20)
+    sha.update(f"{image.mode}:{image.size}".encode("ascii"))
+    sha.update(image.tobytes())
+    digest = sha.hexdigest()
+
+    def _forget(_ref, key=key):
+        with _DIGESTS_LOCK:
+            if _DIGESTS.get(key, (None,))[0] is _ref:
+                del _DIGESTS[key]
+
+    with _DIGESTS_LOCK:
+        _DIGESTS[key] = (weakref.ref(image, _forget), digest)
+    return digest
+
+
+def clear_encode_cache():
+    """Empties the encoded payload cache."""
+    global _ENCODE_CACHE_SIZE
+    with _ENCODE_CACHE_LOCK:
+        _ENCODE_CACHE.clear()
+        _ENCODE_CACHE_SIZE = 0
+
+
+class ImageEncoder:
+    """
+    Turns PIL images into the byte payloads sent to vision models.
+
+    Controls the size/fidelity trade-off per request: output format, quality,
+    max long edge, chroma subsampling and progressive encoding. Settings come
+    from the `encoding:` block of settings.yaml, with optional per-mode
+    overrides (see from_settings). Payloads are cached by image content and
+    settings; cache misses are encoded in a thread pool.
+    """
+    FORMATS = ("JPEG", "WEBP", "PNG")
+
+    def __init__(self, format: str = "JPEG", quality: Optional[int] = None,
+                 max_edge: Optional[int] = None, subsampling: Optional[str] = None,
+                 progressive: bool = False, workers: int = 4):
+        """
+        Args:
+            format: "JPEG", "WEBP" or "PNG" (check the model backend accepts it).
+            quality: Lossy quality 1-100 (None = Pillow default).
+            max_edge: Downscale images so their longest side fits (None = keep size).
+            subsampling: JPEG chroma subsampling ("4:4:4", "4:2:2", "4:2:0"; None = Pillow default).
+            progressive: Progressive JPEG.
+            workers: Threads used to encode images missing from the cache.
+        """
+        self.format = format.upper()
+        if self.format not in self.FORMATS:
+            raise ValueError(f"Unsupported image format: {format} (expected one of {', '.join(self.FORMATS)})")
+        self.quality = quality
+        self.max_edge = max_edge
+        self.subsampling = subsampling
+        self.progressive = progressive
+        self.workers = workers
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any], mode: Optional[str] = None) -> "ImageEncoder":
+        """
+        Builds an encoder from the `encoding:` settings block: `default` values,
+        overridden by `modes.<mode>` if present.
+        """
+        encoding = (settings or {}).get("encoding", {}) or {}
+        options = dict(encoding.get("default", {}) or {})
+        if mode:
+            options.update((encoding.get("modes", {}) or {}).get(mode, {}) or {})
+        return cls(
+            format=options.get("format", "JPEG"),
+            quality=options.get("quality"),
+            max_edge=options.get("max_edge"),
+            subsampling=options.get("subsampling"),
+            progressive=options.get("progressive", False),
+            workers=options.get("workers", 4),
+        )
+
+    @property
+    def settings_key(self) -> Tuple:
+        """Settings that affect the output bytes (part of the cache key)."""
+        return (self.format, self.quality, self.max_edge, self.subsampling, self.progressive)
+
+    def encode(self, frames: Iterable[Image.Image]) -> Tuple[List[bytes], Dict[str, int]]:
+        """
+        Encodes frames, reusing cached payloads.
+
+        Args:
+            frames: PIL Images (any iterable; frames are submitted as they arrive).
+
+        Returns:
+            (payloads, report) where report has 'images', 'bytes', 'cache_hits'
+            and 'encoded' (number of cache misses).
+        """
+        payloads: List[Optional[bytes]] = []
+        pending = [] # (position, cache key, future)
+        cache_hits = 0
+
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+            for position, frame in enumerate(frames):
+                key = (image_digest(frame), self.settings_key)
+                with _ENCODE_CACHE_LOCK:
+                    payload = _ENCODE_CACHE.get(key)
+                    if payload is not None:
+                        _ENCODE_CACHE.move_to_end(key)
+                payloads.append(payload)
+                if payload is None:
+                    pending.append((position, key, pool.submit(self.encode_one, frame)))
+                else:
+                    cache_hits += 1
+
+            for position, key, future in pending:
+                payload = future.result()
+                payloads[position] = payload
+                self._cache_payload(key, payload)
+
+        report = {
+            'images': len(payloads),
+            'bytes': sum(len(p) for p in payloads),
+            'cache_hits': cache_hits,
+            'encoded': len(pending),
+        }
+        return payloads, report
+
+    def encode_one(self, frame: Image.Image) -> bytes:
+        """Flattens transparency, optionally downscales, and encodes one frame (no cache)."""
+        # Handle RGBA/Transparency by converting to RGB with white background
+        if frame.mode in ('RGBA', 'LA') or (frame.mode == 'P' and 'transparency' in frame.info):
+            background = Image.new('RGB', frame.size, (255, 255, 255))
+            if frame.mode == 'P':
+                frame = frame.convert('RGBA')
+            background.paste(frame, mask=frame.split()[-1])
+            frame = background
+        elif frame.mode != 'RGB':
+            frame = frame.convert('RGB')
+
+        if self.max_edge and max(frame.size) > self.max_edge:
+            frame = frame.copy() # thumbnail() works in place: never touch the caller's image
+            frame.thumbnail((self.max_edge, self.max_edge), Image.Resampling.LANCZOS)
+
+        options: Dict[str, Any] = {}
+        if self.format in ("JPEG", "WEBP") and self.quality is not None:
+            options['quality'] = self.quality
+        if self.format == "JPEG":
+            if self.subsampling is not None:
+                options['subsampling'] = self.subsampling
+            if self.progressive:
+                options['progressive'] = True
+
+        buffer = io.BytesIO()
+        frame.save(buffer, format=self.format, **options)
+        return buffer.getvalue()
+
+    def _cache_payload(self, key: tuple, payload: bytes):
+        global _ENCODE_CACHE_SIZE
+        with _ENCODE_CACHE_LOCK:
+            if key in _ENCODE_CACHE:
+                return
+            _ENCODE_CACHE[key] = payload
+            _ENCODE_CACHE_SIZE += len(payload)
+            while _ENCODE_CACHE_SIZE > ENCODE_CACHE_MAX_BYTES and len(_ENCODE_CACHE) > 1:
+                _, evicted = _ENCODE_CACHE.popitem(last=False)
+                _ENCODE_CACHE_SIZE -= len(evicted)
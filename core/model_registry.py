@@ -0,0 +1,220 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+# One registry per client, shared by every Streamlit session of this process.
+_REGISTRIES: Dict[int, "ModelRegistry"] = {}
+_REGISTRIES_LOCK = threading.Lock()
+
+
+class ModelInfo(NamedTuple):
+    """Metadata of an installed model. Fields from `show` are None until known."""
+    name: str
+    size: int = 0 # Bytes on disk (0 for cloud models)
+    family: str = ""
+    parameter_size: str = ""
+    vision: Optional[bool] = None
+    context_length: Optional[int] = None
+    capabilities: Tuple[str, ...] = ()
+
+
+def get_registry(client, ttl_seconds: float = 60.0) -> "ModelRegistry":
+    """Returns the shared registry of a client, creating it on first use."""
+    with _REGISTRIES_LOCK:
+        registry = _REGISTRIES.get(id(client))
+        if registry is None or registry.client is not client:
+            registry = ModelRegistry(client, ttl_seconds=ttl_seconds)
+            _REGISTRIES[id(client)] = registry
+    return registry
+
+
+class ModelRegistry:
+    """
+    Cached view of the models available on an Ollama server.
+
+    The model list is fetched once, then served from memory. After `ttl_seconds`
+    it is refreshed in a background thread while callers keep getting the
+    previous list, so UI reruns never wait on the server. Per-model metadata
+    (family, vision capability, context length) comes from `show` and is cached
+    by model digest, so only new or updated models cost an extra call.
+    """
+    SHOW_WORKERS = 4
+    RETRY_SECONDS = 5.0
+
+    def __init__(self, client, ttl_seconds: float = 60.0):
+        """
+        Args:
+            client: ollama.Client used for `list` and `show`.
+            ttl_seconds: Age after which the list is refreshed in the background.
+        """
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.last_error: Optional[Exception] = None # Error of the last failed refresh
+
+        self._models: Optional[List[ModelInfo]] = None
+        self._fetched_at = 0.0
+        self._failed_at = float('-inf')
+        self._details: Dict[str, Dict[str, Any]] = {} # digest -> show metadata
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def models(self, vision_only: bool = False) -> List[ModelInfo]:
+        """
+        Returns the available models. Blocks only until a first list is fetched;
+        after that a stale list triggers a background refresh.
+
+        Args:
+            vision_only: Keep only models that accept images. Models whose
+                capabilities are unknown are kept.
+
+        Raises:
+            Exception: The server error, if no list was ever fetched. A failed
+                first fetch is only retried after RETRY_SECONDS.
+        """
+        with self._lock:
+            models = self._models
+            stale = time.monotonic() - self._fetched_at > self.ttl_seconds
+            failed_recently = time.monotonic() - self._failed_at < self.RETRY_SECONDS
+
+        if models is None:
+            if failed_recently and self.last_error is not None:
+                raise self.last_error
+            models = self.refresh()
+        elif stale:
+            self._refresh_in_background()
+
+        if vision_only:
+            models = [m for m in models if m.vision is not False]
+        return models
+
+    def names(self, vision_only: bool = False) -> List[str]:
+        return [m.name for m in self.models(vision_only=vision_only)]
+
+    def get(self, name: str) -> Optional[ModelInfo]:
+        """Metadata of a model from the cached list (None if unknown or not fetched yet). Never blocks."""
+        with self._lock:
+            models = self._models or []
+        for model in models:
+            if model.name == name:
+                return model
+        return None
+
+    def refresh(self) -> List[ModelInfo]:
+        """Fetches the list now (blocking) and returns it."""
+        try:
+            models = self._fetch()
+        except Exception as e:
+            self.last_error = e
+            with self._lock:
+                self._failed_at = time.monotonic()
+            raise
+        with self._lock:
+            self._models = models
+            self._fetched_at = time.monotonic()
+        self.last_error = None
+        return models
+
+    def invalidate(self):
+        """Marks the list stale so the next call refreshes it."""
+        with self._lock:
+            self._fetched_at = 0.0
+
+    # --- Internals ---
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def _run():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️ Model list refresh failed, keeping cached list: {e}")
+                with self._lock:
+                    self._fetched_at = time.monotonic() # Retry after another TTL, not on every rerun
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=_run, name="model-registry-refresh", daemon=True).start()
+
+    def _fetch(self) -> List[ModelInfo]:
+        listed = self._parse_list(self.client.list())
+
+        missing = [(name, digest) for name, digest, _, _ in listed if digest not in self._details]
+        if missing:
+            with ThreadPoolExecutor(max_workers=self.SHOW_WORKERS) as pool:
+                for (name, digest), details in zip(missing, pool.map(lambda m: self._show(m[0]), missing)):
+                    if details is not None:
+                        self._details[digest] = details
+
+        models = []
+        for name, digest, size, summary in listed:
+            details = self._details.get(digest, {})
+            models.append(ModelInfo(
+                name=name,
+                size=size,
+                family=details.get('family') or summary.get('family', ""),
+                parameter_size=details.get('parameter_size') or summary.get('parameter_size', ""),
+                vision=details.get('vision'),
+                context_length=details.get('context_length'),
+                capabilities=details.get('capabilities', ()),
+            ))
+        return models
+
+    def _show(self, name: str) -> Optional[Dict[str, Any]]:
+        """Metadata from `show`, or None if the call fails (retried on the next refresh)."""
+        try:
+            info = self.client.show(name)
+        except Exception as e:
+            print(f"⚠️ Could not read metadata of {name}: {e}")
+            return None
+
+        capabilities = tuple(getattr(info, 'capabilities', None) or ())
+        modelinfo = dict(getattr(info, 'modelinfo', None) or {})
+        details = getattr(info, 'details', None)
+        families = list(getattr(details, 'families', None) or [])
+
+        if capabilities:
+            vision = 'vision' in capabilities
+        else:
+            # Older servers: vision models ship a projector (clip/mllama) or vision.* keys
+            vision = (any(f in ('clip', 'mllama') for f in families)
+                      or any('.vision.' in key for key in modelinfo))
+
+        context_length = next(
+            (value for key, value in modelinfo.items() if key.endswith('.context_length')),
+            None
+        )
+
+        return {
+            'family': getattr(details, 'family', None) or "",
+            'parameter_size': getattr(details, 'parameter_size', None) or "",
+            'vision': vision,
+            'context_length': context_length,
+            'capabilities': capabilities,
+        }
+
+    @staticmethod
+    def _parse_list(models_info) -> List[Tuple[str, str, int, Dict[str, str]]]:
+        """(name, digest, size, details) per model, across client versions (objects or dicts)."""
+        entries = models_info.models if hasattr(models_info, 'models') else models_info
+        listed = []
+        for m in entries:
+            if isinstance(m, dict):
+                name = m.get('model') or m.get('name', 'unknown')
+                details = m.get('details') or {}
+                listed.append((name, m.get('digest') or name, m.get('size') or 0, dict(details)))
+            elif hasattr(m, 'model'):
+                details = getattr(m, 'details', None)
+                summary = {
+                    'family': getattr(details, 'family', None) or "",
+                    'parameter_size': getattr(details, 'parameter_size', None) or "",
+                }
+                listed.append((m.model, m.digest or m.model, m.size or 0, summary))
+            else:
+                listed.append((str(m), str(m), 0, {}))
+        return listed
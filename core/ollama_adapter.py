@@ -1,54 +1,110 @@
+import threading
+from typing import Any, Dict, Optional
+
+import httpx
 import ollama
-from PIL import Image
-import io
+from core.image_encoder import ImageEncoder
 from core.interfaces import AIModel
 
+# Long-lived clients shared by every adapter (and Streamlit session) of this process,
+# one per connection config, so HTTP connections are pooled and reused across requests.
+_CLIENTS: Dict[tuple, ollama.Client] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_client(host: Optional[str] = None, connect_timeout: float = 10.0,
+               read_timeout: Optional[float] = 120.0, max_connections: int = 10,
+               keepalive_expiry: float = 60.0) -> ollama.Client:
+    """
+    Returns the shared ollama.Client for a connection config, creating it on first use.
+
+    Args:
+        host: Ollama server URL (None = OLLAMA_HOST env var or localhost).
+        connect_timeout: Seconds to establish a connection.
+        read_timeout: Seconds to wait for each response chunk (None = no limit).
+        max_connections: Connection pool size.
+        keepalive_expiry: Seconds an idle pooled connection is kept open.
+    """
+    config = (host, connect_timeout, read_timeout, max_connections, keepalive_expiry)
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(config)
+        if client is None:
+            client = ollama.Client(
+                host=host,
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections,
+                    keepalive_expiry=keepalive_expiry,
+                ),
+            )
+            _CLIENTS[config] = client
+    return client
+
+
+def client_from_settings(settings: Dict[str, Any]) -> ollama.Client:
+    """Returns the shared client for the `model:` settings block."""
+    model = (settings or {}).get("model", {}) or {}
+    return get_client(
+        host=model.get("host"),
+        connect_timeout=model.get("connect_timeout", 10.0),
+        read_timeout=model.get("timeout", 120.0),
+        max_connections=model.get("max_connections", 10),
+        keepalive_expiry=model.get("keepalive_expiry", 60.0),
+    )
+
+
 class OllamaAdapter(AIModel):
     """
     Adaptateur pour Ollama (local ou cloud).
     Supporte tous les modèles disponibles via Ollama (Llama, Mistral, Gemini, etc.)
     """
-    def __init__(self, model_name="gemini-3-pro-preview", temperature=0.7):
+    def __init__(self, model_name="gemini-3-pro-preview", temperature=0.7, encoder=None,
+                 client=None, keep_alive=None):
+        """
+        Args:
+            model_name (str): Ollama model tag.
+            temperature (float): Sampling temperature.
+            encoder (ImageEncoder): Image payload encoder (format, quality, max size).
+                Defaults to plain JPEG at Pillow's default quality, full size.
+            client (ollama.Client): Client to use. Defaults to the shared pooled
+                client for the local server (see get_client / client_from_settings).
+            keep_alive (str|float): How long Ollama keeps the model loaded after
+                a request (e.g. "10m", -1 = forever; None = server default).
+        """
         self.model_name = model_name
         self.temperature = temperature
+        self.encoder = encoder or ImageEncoder()
+        self.client = client or get_client()
+        self.keep_alive = keep_alive
+        self.last_payload_report = None # Bytes/images of the last request (see ImageEncoder.encode)
 
     def analyze(self, frames, prompt, stream=True):
         """
         Send frames and prompt to AI model via Ollama.
-        
+
         Args:
-            frames (list): List of PIL Image objects.
+            frames (iterable): PIL Image objects. Any iterable works (e.g. a
+                generator over VideoProcessor.iter_frames), frames are encoded as
+                they arrive.
             prompt (str): The text prompt.
             stream (bool): Whether to stream the response.
-            
+
         Yields:
             str: Chunks of the response if streaming.
         """
-        # Convert PIL images to bytes for Ollama
-        images_bytes = []
-        for frame in frames:
-            # Handle RGBA/Transparency by converting to RGB with white background
-            if frame.mode in ('RGBA', 'LA') or (frame.mode == 'P' and 'transparency' in frame.info):
-                background = Image.new('RGB', frame.size, (255, 255, 255))
-                if frame.mode == 'P':
-                    frame = frame.convert('RGBA')
-                background.paste(frame, mask=frame.split()[-1])
-                frame = background
-            elif frame.mode != 'RGB':
-                frame = frame.convert('RGB')
-                
-            img_byte_arr = io.BytesIO()
-            frame.save(img_byte_arr, format='JPEG')
-            images_bytes.append(img_byte_arr.getvalue())
+        # Convert PIL images to bytes for Ollama (cached + parallel)
+        images_bytes, self.last_payload_report = self.encoder.encode(frames)
 
         # Call Ollama
         # Note: Ollama python client handles image bytes directly in 'images' list
         try:
-            response = ollama.generate(
+            response = self.client.generate(
                 model=self.model_name,
                 prompt=prompt,
                 images=images_bytes,
                 stream=stream,
+                keep_alive=self.keep_alive,
                 options={
                     "temperature": self.temperature
                 }
@@ -56,18 +112,19 @@ class OllamaAdapter(AIModel):
         except Exception as e:
             if "temperature" in str(e).lower() and self.temperature > 2.0:
                 print(f"⚠️ Temperature {self.temperature} rejected by model. Falling back to 2.0.")
-                response = ollama.generate(
+                response = self.client.generate(
                     model=self.model_name,
                     prompt=prompt,
                     images=images_bytes,
                     stream=stream,
+                    keep_alive=self.keep_alive,
                     options={
                         "temperature": 2.0
                     }
                 )
             else:
                 raise e
-        
+
         if stream:
             for chunk in response:
                 yield chunk['response']
@@ -0,0 +1,192 @@
+import json
+import re
+import threading
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from jinja2 import Environment
+
+
+class PromptRequest(NamedTuple):
+    """Everything that shapes the final prompt of one analysis."""
+    mode: str
+    style: Optional[str] = None # style_transfer_pro style
+    locked_identity: Optional[Dict[str, Any]] = None # Master identity JSON (character lock)
+    image_focus: Tuple[Tuple[float, str], ...] = () # (weight, focus) per image, in payload order
+    alt_pov_looks: Tuple[str, ...] = () # ALT POV looks to generate (empty = template default)
+    look_fidelity: Optional[int] = None # ALT POV content fidelity, 0-100
+    style_fidelity: Optional[int] = None # ALT POV aesthetic fidelity, 0-100
+    custom_instruction: str = ""
+
+
+class PromptBuilder:
+    """
+    Builds final prompts from prompts.yaml templates and a PromptRequest.
+
+    Templates are compiled once when the builder is created (only those that
+    use Jinja syntax; the others are used verbatim), and the rendered base
+    prompt of each (mode, style, identity lock) is cached, so building a
+    prompt is string assembly only. Shared by the UI and the batch CLI.
+    """
+    # Modes that get the per-image weights & focus block (plus every "fusion" mode)
+    BIOMETRIC_MODES = ("alt_pov", "ultimate_biome_fashion_icon", "experimental_fashion_lab", "biome_ultra_detailed", "biometric_complete", "deepstack_biometrics")
+
+    # HARDENED FOCUS RULES
+    FOCUS_INSTRUCTIONS = {
+        "Character/Face": "(STRICTLY EXTRACT FACE GEOMETRY & IDENTITY. IGNORE BACKGROUND. STOP ANALYSIS BELOW THE NECK. EXTRACT PRECISE HAIR STYLE & TEXTURE)",
+        "Pose/Body": "(STRICTLY EXTRACT POSE & BODY SHAPE. IGNORE FACE IDENTITY. IGNORE CLOTHING TEXTURE/DETAILS)",
+        "Clothing": "(STRICTLY EXTRACT OUTFIT DETAILS/FABRIC. IGNORE FACE. IGNORE POSE. **IGNORE HAIR** - Hair belongs to Face Source!)",
+        "Background": "(STRICTLY EXTRACT ENVIRONMENT. IGNORE SUBJECT)",
+        "All Image": "(Extract EVERYTHING: Face, Pose, Clothing, Background)",
+    }
+
+    # Identity lock: JSON output instructions removed from the template ("PART 1... JSON" blocks and schema examples)
+    JSON_SECTION_PATTERNS = (
+        re.compile(r"### PART 1:.*?```json.*?```", re.DOTALL),
+        re.compile(r"⚠️ \*\*CRITICAL - OUTPUT ORDER:\*\*.*?DO NOT skip the JSON\.", re.DOTALL),
+    )
+
+    JINJA_MARKERS = ("{{", "{%", "{#")
+
+    def __init__(self, prompts: Dict[str, Any], environment: Optional[Environment] = None):
+        """
+        Args:
+            prompts: Prompt config as loaded from prompts.yaml.
+            environment: jinja2 Environment to compile templates in (shared by
+                the loader across reloads; a default one otherwise).
+        """
+        self.prompts = prompts
+        self.templates: Dict[str, Any] = {} # mode -> jinja2.Template, or str when static
+        self._base_cache: Dict[Tuple[str, Optional[str], bool], str] = {}
+        self._lock = threading.Lock()
+
+        environment = environment or Environment()
+        for mode, config in prompts.get("analysis_modes", {}).items():
+            template_str = config["template"]
+            if any(marker in template_str for marker in self.JINJA_MARKERS):
+                self.templates[mode] = environment.from_string(template_str)
+            else:
+                self.templates[mode] = template_str
+
+    def build(self, request: PromptRequest) -> str:
+        """
+        Returns the final prompt for a request.
+
+        Raises:
+            KeyError: Unknown analysis mode.
+        """
+        mode = request.mode
+        prompt_text = self.base_prompt(mode, request.style, strip_json=bool(request.locked_identity))
+
+        # --- CHARACTER LOCKING INJECTION ---
+        if request.locked_identity:
+            prompt_text = self._identity_block(request.locked_identity) + prompt_text
+
+        # Weights & Focus Info for fusion modes AND biometric modes
+        if ("fusion" in mode.lower() or mode in self.BIOMETRIC_MODES) and request.image_focus:
+            prompt_text = self._weights_block(request.image_focus) + prompt_text
+
+        if mode == "alt_pov":
+            if request.alt_pov_looks:
+                selected_looks_str = ", ".join(request.alt_pov_looks)
+                prompt_text = prompt_text + f"""
+\n🚨 **CRITICAL OVERRIDE - MANDATORY:**
+You MUST generate ONLY the following looks: {selected_looks_str}
+**DO NOT GENERATE** any other looks.
+"""
+            if request.look_fidelity is not None:
+                fidelity = request.look_fidelity
+                prompt_text = prompt_text + f"""
+\n🎚️ **CREATIVE TRANSFORMATION LEVEL: {100 - fidelity}%**
+(Fidelity set to {fidelity}%)
+
+**INSTRUCTION BASED ON FIDELITY:**
+- **IF FIDELITY IS HIGH (>80%):** You must **PRESERVE the original outfit and environment**. The "Alt POV" should only be a change of camera angle. DO NOT change the clothes.
+- **IF FIDELITY IS MEDIUM (50-80%):** You may slightly modify the outfit (add accessories, change texture) but keep the core theme.
+- **IF FIDELITY IS LOW (<50%):** **FULL TRANSFORMATION ALLOWED.** You can completely change the outfit and scenario to match the requested "Look" (e.g., Latex, Sci-Fi, etc.). **IGNORE original clothes.**
+"""
+            if request.style_fidelity is not None:
+                style_fid = request.style_fidelity
+                prompt_text = prompt_text + f"""
+\n🎞️ **AESTHETIC/TEXTURE INSTRUCTION:**
+- **Aesthetic Fidelity: {style_fid}%**
+- IF > 80%: PRESERVE all film grain, noise, blur, and lighting imperfections from the source. Do NOT clean it up.
+- IF < 40%: MODERNIZE the image. Remove noise, sharpen details, use 4K digital aesthetic.
+"""
+
+        # Custom Instruction
+        if request.custom_instruction and request.custom_instruction.strip():
+            prompt_text = prompt_text + f"\n\n⚠️ **IMPORTANT USER OVERRIDE / CUSTOM INSTRUCTION:**\n{request.custom_instruction.strip()}\n(This instruction takes PRIORITY over all previous instructions.)\n"
+
+        return prompt_text
+
+    def base_prompt(self, mode: str, style: Optional[str] = None, strip_json: bool = False) -> str:
+        """Rendered template of a mode (cached), optionally without its JSON output sections."""
+        if mode not in self.templates:
+            raise KeyError(f"Unknown analysis mode: {mode}")
+        # Only templates with Jinja syntax depend on the style
+        cache_key = (mode, style if not isinstance(self.templates[mode], str) else None, strip_json)
+        with self._lock:
+            cached = self._base_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        template = self.templates[mode]
+        text = template if isinstance(template, str) else template.render(style=style)
+        if strip_json:
+            for pattern in self.JSON_SECTION_PATTERNS:
+                text = pattern.sub("", text)
+
+        with self._lock:
+            self._base_cache[cache_key] = text
+        return text
+
+    # --- Blocks ---
+
+    def _identity_block(self, identity: Dict[str, Any]) -> str:
+        master_id_json = json.dumps(identity, indent=2)
+        return f"""
+\n\n═══════════════════════════════════════════════════════════════
+⚠️ **CRITICAL INSTRUCTION: CHARACTER CONSISTENCY LOCK** ⚠️
+═══════════════════════════════════════════════════════════════
+
+You must strictly adhere to the following **MASTER BIOMETRIC DNA** for the subject.
+**DO NOT** re-invent or guess facial features.
+**DO NOT** allow the artistic style to alter the bone structure or key measurements.
+**YOU MUST** apply the requested style (lighting, clothing, mood) onto THIS specific face/body.
+
+**🧬 MASTER IDENTITY DATA (Immutable):**
+```json
+{master_id_json}
+```
+
+**MANDATORY RULES:**
+1. **Face Shape & Features:** Must match the JSON exactly (Eyes, Nose, Mouth, Jaw).
+2. **Body Type:** Must match the JSON somatotype and proportions.
+3. **Skin Details:** Preserve specific marks/texture described in the JSON.
+4. **Style Application:** Apply the style AROUND this identity. Do not morph the identity to fit the style.
+
+⚠️ **OUTPUT INSTRUCTION:**
+**PROCEED DIRECTLY TO THE LOOKS/PROMPTS.**
+**DO NOT** output the JSON block again. It is provided above as reference only.
+
+═══════════════════════════════════════════════════════════════\n\n
+"""
+
+    def _weights_block(self, image_focus: Tuple[Tuple[float, str], ...]) -> str:
+        weights_info = []
+        for idx, (w, focus) in enumerate(image_focus):
+            info_parts = []
+            if w != 1.0:
+                info_parts.append(f"Weight {w}")
+            focus_instruction = self.FOCUS_INSTRUCTIONS.get(focus, f"(Focus on {focus})")
+            info_parts.append(f"Focus: {focus} {focus_instruction}")
+            weights_info.append(f"- Image {idx+1}: {', '.join(info_parts)}")
+
+        weight_context = "\n\n**USER ASSIGNED WEIGHTS & FOCUS:**\n" + "\n".join(weights_info) + "\n\n"
+        priority_rule = """
+**⚡ FUSION PRIORITY PROTOCOL (STRICT IDENTITY):**
+1. For **FACE/HEAD/HAIR** details: Use ONLY the image marked "Focus: Face". **This Focus OVERRIDES strict weights.** If Image 1 is "Face", Face 1 represents the identity.
+2. For **BODY/POSE/CLOTHING** details: Use ONLY images marked "Focus: Pose" or "Focus: Clothing". 
+   **⛔ CRITICAL:** DO NOT use the "Face" image for Body/Clothing description (unless 'All Image' is set).
+"""
+        return weight_context + priority_rule
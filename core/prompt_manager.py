@@ -1,31 +1,236 @@
 import yaml
 import os
+import glob
+import pickle
+import hashlib
+import tempfile
+import threading
 from core.interfaces import PromptLoader
-from typing import Dict, Any
+from core.prompt_builder import PromptBuilder
+from jinja2 import Environment
+from typing import Dict, Any, NamedTuple, Optional, Tuple
+
+try:
+    from watchdog.events import (FileSystemEventHandler, FileCreatedEvent, FileDeletedEvent,
+                                 FileModifiedEvent, FileMovedEvent)
+    from watchdog.observers import Observer
+except ImportError: # Hot reload falls back to an mtime check on load
+    FileSystemEventHandler = object
+    FileCreatedEvent = FileDeletedEvent = FileModifiedEvent = FileMovedEvent = type(None)
+    Observer = None
+
+# libyaml-backed loader when PyYAML was built with it (~30x faster on prompts.yaml)
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+CONFIG_CACHE_VERSION = 1 # Bump when the cached payload layout changes
+
+
+class ConfigSnapshot(NamedTuple):
+    """A consistent, immutable view of the config files at one point in time."""
+    settings: Dict[str, Any]
+    prompts: Dict[str, Any]
+    builder: PromptBuilder
+    digest: str # Hash of both files' content
+    version: int # Incremented at every swap
+
+
+class _ConfigFileHandler(FileSystemEventHandler):
+    """Triggers a (debounced) reload when one of the watched files changes."""
+    DEBOUNCE_SECONDS = 0.2 # Editors often write a file in several events
+    # Only events that can change content: open/close events (reading the files
+    # during a reload emits them) would otherwise re-trigger the reload forever
+    CHANGE_EVENTS = (FileModifiedEvent, FileCreatedEvent, FileMovedEvent, FileDeletedEvent)
+
+    def __init__(self, loader: "YamlPromptLoader"):
+        self.loader = loader
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def on_any_event(self, event):
+        if not isinstance(event, self.CHANGE_EVENTS):
+            return
+        paths = {os.path.abspath(getattr(event, "src_path", "")), os.path.abspath(getattr(event, "dest_path", "") or "")}
+        if not paths & self.loader.watched_paths:
+            return
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.DEBOUNCE_SECONDS, self._reload_if_changed)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _reload_if_changed(self):
+        if self.loader._current_stamps() != self.loader._stamps:
+            self.loader.reload()
+
 
 class YamlPromptLoader(PromptLoader):
     """
     Charge les prompts depuis des fichiers YAML locaux.
     C'est l'implémentation par défaut pour le développement local.
+
+    Le chargement est fait une fois puis gardé en mémoire (snapshot). Avec
+    `watch()`, les fichiers sont surveillés (watchdog) : à chaque changement de
+    contenu, settings/prompts sont relus et tous les templates recompilés dans
+    l'Environment jinja2 partagé, puis le nouveau snapshot remplace l'ancien
+    d'un coup (jamais de config à moitié rechargée).
     """
-    def __init__(self, settings_path: str = "config/settings.yaml", prompts_path: str = "config/prompts.yaml"):
+    CACHE_MAX_ENTRIES = 8
+
+    def __init__(self, settings_path: str = "config/settings.yaml", prompts_path: str = "config/prompts.yaml",
+                 environment: Optional[Environment] = None, cache_dir: Optional[str] = ".cache/config"):
+        """
+        Args:
+            settings_path, prompts_path: YAML files.
+            environment: Shared jinja2 Environment templates are compiled in.
+            cache_dir: Where parsed configs are cached, keyed by file content
+                hash (None = always parse the YAML).
+        """
         self.settings_path = settings_path
         self.prompts_path = prompts_path
+        self.cache_dir = cache_dir
+        self.environment = environment or Environment()
+        self.watched_paths = {os.path.abspath(settings_path), os.path.abspath(prompts_path)}
+
+        self._snapshot: Optional[ConfigSnapshot] = None
+        self._stamps: Tuple[Tuple[int, int], ...] = () # (mtime_ns, size) per file at the last load
+        self._failed_digest: Optional[str] = None
+        self._reload_lock = threading.Lock()
+        self._observer = None
 
     def load_config(self) -> tuple[Dict[str, Any], Dict[str, Any]]:
         """
-        Lit les fichiers YAML et retourne les dictionnaires.
+        Retourne un tuple (settings, prompts).
+        """
+        snapshot = self.snapshot()
+        return snapshot.settings, snapshot.prompts
+
+    def prompt_builder(self) -> PromptBuilder:
+        """Builder with the templates of the current config, already compiled."""
+        return self.snapshot().builder
+
+    def snapshot(self) -> ConfigSnapshot:
+        """Current config. Loads it on first use; without a watcher, reloads if a file's mtime or size changed."""
+        snapshot = self._snapshot
+        if snapshot is None or (self._observer is None and self._current_stamps() != self._stamps):
+            self.reload()
+            snapshot = self._snapshot
+        return snapshot
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Re-reads the files and swaps in a new snapshot if their content changed.
+
+        Args:
+            force: Rebuild even if the content hash is unchanged.
+
+        Returns:
+            True if a new snapshot was swapped in. A file that fails to parse
+            keeps the previous snapshot (and raises only on the first load).
         """
-        if not os.path.exists(self.settings_path):
-            raise FileNotFoundError(f"Settings file not found: {self.settings_path}")
-        
-        if not os.path.exists(self.prompts_path):
-            raise FileNotFoundError(f"Prompts file not found: {self.prompts_path}")
+        with self._reload_lock:
+            previous = self._snapshot
+            for path, label in ((self.settings_path, "Settings"), (self.prompts_path, "Prompts")):
+                if not os.path.exists(path):
+                    if previous is None:
+                        raise FileNotFoundError(f"{label} file not found: {path}")
+                    return False # Mid-save (delete + rename) or removed: keep the current config
+
+            stamps = self._current_stamps()
+            with open(self.settings_path, "rb") as f:
+                settings_raw = f.read()
+            with open(self.prompts_path, "rb") as f:
+                prompts_raw = f.read()
+            digest = hashlib.sha256(settings_raw + b"\0" + prompts_raw).hexdigest()
+
+            if previous is not None and digest in (previous.digest, self._failed_digest) and not force:
+                self._stamps = stamps # Touched but identical (or known broken): nothing to recompile
+                return False
+
+            try:
+                settings, prompts = self._parse(settings_raw, prompts_raw, digest)
+                builder = PromptBuilder(prompts, environment=self.environment)
+            except Exception as e:
+                if previous is None:
+                    raise
+                print(f"⚠️ Config reload failed, keeping previous version: {e}")
+                self._stamps = stamps
+                self._failed_digest = digest
+                return False
+
+            self._snapshot = ConfigSnapshot(
+                settings=settings,
+                prompts=prompts,
+                builder=builder,
+                digest=digest,
+                version=previous.version + 1 if previous else 1,
+            )
+            self._stamps = stamps
+            if previous is not None:
+                print(f"🔄 Config reloaded (v{self._snapshot.version})")
+            return True
 
-        with open(self.settings_path, "r", encoding="utf-8") as f:
-            settings = yaml.safe_load(f)
-        
-        with open(self.prompts_path, "r", encoding="utf-8") as f:
-            prompts = yaml.safe_load(f)
-            
+    def watch(self) -> bool:
+        """
+        Starts watching the config files in a background thread.
+        Returns False if watchdog is unavailable (mtime check on load is used instead).
+        """
+        if self._observer is not None:
+            return True
+        if Observer is None:
+            return False
+        self.snapshot()
+        handler = _ConfigFileHandler(self)
+        observer = Observer()
+        for directory in {os.path.dirname(path) for path in self.watched_paths}:
+            observer.schedule(handler, directory, recursive=False)
+        observer.daemon = True
+        observer.start()
+        self._observer = observer
+        return True
+
+    def stop(self):
+        """Stops the file watcher."""
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=2)
+            self._observer = None
+
+    def _parse(self, settings_raw: bytes, prompts_raw: bytes, digest: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Parsed (settings, prompts): from the cache file when the content is unchanged, else from YAML."""
+        cache_path = None
+        if self.cache_dir:
+            cache_path = os.path.join(self.cache_dir, f"{digest}.v{CONFIG_CACHE_VERSION}.{YAML_LOADER.__name__}.pickle")
+            try:
+                with open(cache_path, "rb") as f:
+                    return pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+                pass # Missing or unreadable: parse and rewrite it
+
+        settings = yaml.load(settings_raw.decode("utf-8"), Loader=YAML_LOADER)
+        prompts = yaml.load(prompts_raw.decode("utf-8"), Loader=YAML_LOADER)
+
+        if cache_path:
+            self._write_cache(cache_path, (settings, prompts))
         return settings, prompts
+
+    def _write_cache(self, cache_path: str, parsed: Tuple[Dict[str, Any], Dict[str, Any]]):
+        """Atomically writes the parsed config, keeping only the most recent cache files."""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(parsed, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+            entries = sorted(glob.glob(os.path.join(self.cache_dir, "*.pickle")), key=os.path.getmtime, reverse=True)
+            for stale in entries[self.CACHE_MAX_ENTRIES:]:
+                os.remove(stale)
+        except OSError as e:
+            print(f"⚠️ Could not write config cache: {e}")
+
+    def _current_stamps(self) -> Tuple[Tuple[int, int], ...]:
+        """(mtime_ns, size) of each config file (empty if one is missing)."""
+        try:
+            stats = [os.stat(path) for path in (self.settings_path, self.prompts_path)]
+        except OSError:
+            return ()
+        return tuple((stat.st_mtime_ns, stat.st_size) for stat in stats)
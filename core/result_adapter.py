@@ -1,6 +1,311 @@
 import re
+import bisect
 import json
-from typing import Dict, List, Tuple, Optional
+from typing import Any, Dict, List, NamedTuple, Tuple, Optional
+
+
+class JSONEvent(NamedTuple):
+    """A complete top-level JSON object found in a stream."""
+    data: Any
+    start: int # Offsets in the whole stream (end exclusive)
+    end: int
+
+
+class StreamingJSONScanner:
+    """
+    Finds JSON objects in streamed text, chunk by chunk.
+
+    Tracks brace depth and string/escape state across chunks and only calls
+    json.loads when a top-level object actually closes, so the cost per chunk
+    is proportional to the chunk (plus one parse per closed object), not to
+    the whole response. Braces in prose are tolerated: a candidate is dropped
+    as soon as it cannot be JSON (a '{' not followed by '"' or '}', or a raw
+    newline inside a string), and candidates that do not parse are skipped.
+    """
+    _SPECIAL = re.compile(r'[{}"\\\n]')
+    _NON_SPACE = re.compile(r'\S')
+
+    def __init__(self):
+        self.events: List[JSONEvent] = []
+        self._offset = 0 # Stream length consumed so far
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._start = -1 # Stream offset of the current top-level '{'
+        self._parts: List[str] = [] # Text of the current candidate object
+        self._await_key = False # Just opened: the next non-space char must be '"' or '}'
+
+    def feed(self, chunk: str) -> List[JSONEvent]:
+        """
+        Consumes a chunk.
+
+        Returns:
+            The JSON objects completed within this chunk (also appended to `events`).
+        """
+        found = []
+        pos = 0 # Start of the part of the chunk not yet copied into _parts
+
+        if self._depth and self._escape and chunk:
+            self._escape = False # Escaped char split across chunks
+            skip = 1
+        else:
+            skip = 0
+        if self._await_key:
+            self._check_opening(chunk, 0)
+
+        escaped = -1 # Index of the char following a backslash in this chunk
+        for match in self._SPECIAL.finditer(chunk, skip):
+            i = match.start()
+            if i == escaped:
+                continue
+            char = chunk[i]
+
+            if self._depth == 0:
+                if char == '{':
+                    self._depth = 1
+                    self._start = self._offset + i
+                    self._parts = []
+                    pos = i
+                    self._await_key = True
+                    self._check_opening(chunk, i + 1)
+                continue
+
+            if self._in_string:
+                if char == '\\':
+                    # Consumes exactly one char (which may be ordinary: \n, \t, \u...)
+                    if i + 1 < len(chunk):
+                        escaped = i + 1
+                    else:
+                        self._escape = True # Next chunk starts with the escaped char
+                elif char == '"':
+                    self._in_string = False
+                elif char == '\n':
+                    self._reset() # Raw newline: not a JSON string, so not JSON
+                continue
+            if char == '\n':
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char == '{':
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(chunk[pos:i + 1])
+                    pos = i + 1
+                    event = self._close(self._offset + i + 1)
+                    if event is not None:
+                        found.append(event)
+
+        if self._depth:
+            self._parts.append(chunk[pos:])
+        self._offset += len(chunk)
+        return found
+
+    def _check_opening(self, chunk: str, start: int) -> bool:
+        """
+        Validates a freshly opened candidate once its first non-space char is
+        known. Returns False if the candidate was dropped.
+        """
+        match = self._NON_SPACE.search(chunk, start)
+        if match is None:
+            return True # Still undecided: check again on the next chunk
+        self._await_key = False
+        if chunk[match.start()] not in '"}':
+            self._reset()
+            return False
+        return True
+
+    def _reset(self):
+        self._depth = 0
+        self._parts = []
+        self._in_string = False
+        self._escape = False
+        self._await_key = False
+
+    def _close(self, end: int) -> Optional[JSONEvent]:
+        candidate = "".join(self._parts)
+        self._reset()
+        try:
+            data = json.loads(candidate)
+        except ValueError:
+            return None # e.g. "{style}" in prose
+        event = JSONEvent(data, self._start, end)
+        self.events.append(event)
+        return event
+
+
+class CodeBlock(NamedTuple):
+    """A fenced code block (```lang ... ```)."""
+    content: str # Between the fence lines, unstripped
+    start: int # Offset of the opening fence
+    end: int # Offset right after the closing fence
+
+
+class Section(NamedTuple):
+    """An emoji heading (## 🎯 ...) with the first code block that follows it."""
+    title: str
+    block: CodeBlock
+    start: int # Offset of the '##'
+
+
+class MarkdownScanner:
+    """
+    Tokenizes a model response for ResultAdapter in a single pass.
+
+    The offsets of every fence (```) and heading marker (##) are collected
+    once; code blocks, emoji sections and fenced JSON candidates are then
+    resolved from those offsets alone, each block being matched at most once,
+    so parsing stays linear in the response length. The matching rules are
+    exactly those of the regexes the adapter used before (a fence may sit
+    anywhere on a line, a block closes at the first fence preceded by a
+    newline and blank space, a heading takes the first block after it).
+    """
+    SECTION_EMOJIS = "🎯📸🧠🚀⚡💎🔥🔬"
+    _SPACE = re.compile(r"\s*")
+    _WORD = re.compile(r"\w*")
+    _TITLE = re.compile(r"[^#\n]*")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.fences = self._find_all("```") # Overlapping hits, as in "````" or "###"
+        self.headings = self._find_all("##")
+        self._blocks: Dict[int, Optional[CodeBlock]] = {}
+        self._unsettled = set() # Fences whose block may still change as the text grows
+
+    def code_blocks(self) -> List[CodeBlock]:
+        """Non-overlapping code blocks, in order."""
+        blocks = []
+        end = 0
+        for fence in self.fences:
+            if fence < end:
+                continue
+            block = self.block_at(fence)
+            if block is not None:
+                blocks.append(block)
+                end = block.end
+        return blocks
+
+    def sections(self) -> List[Section]:
+        """Emoji-headed sections, in order. A heading without a block after it is skipped."""
+        sections = []
+        end = 0
+        for heading in self.headings:
+            if heading < end:
+                continue
+            section = self.section_at(heading)
+            if section is not None:
+                sections.append(section)
+                end = section.block.end
+        return sections
+
+    def section_at(self, heading: int) -> Optional[Section]:
+        """The section headed by the '##' at `heading`, or None."""
+        span = self._title_span(heading)
+        if span is None or span[1] >= len(self.text):
+            return None
+        block = self.next_block(span[1] + 1)
+        if block is None:
+            return None
+        return Section(self.text[span[0]:span[1]].strip(), block, heading)
+
+    def section_pending(self, heading: int) -> bool:
+        """True if the heading is no section yet but could become one as the text grows."""
+        span = self._title_span(heading)
+        return span is not None and (span[1] >= len(self.text) or self.next_block(span[1] + 1) is None)
+
+    def extend(self, chunk: str):
+        """Appends streamed text, scanning only the new part (plus a marker's width back)."""
+        start = len(self.text)
+        self.text += chunk
+        self.fences.extend(self._find_all("```", max(0, start - 2)))
+        self.headings.extend(self._find_all("##", max(0, start - 1)))
+        # Settled blocks are final; the other fences may match differently now
+        self._blocks = {fence: block for fence, block in self._blocks.items()
+                        if block is not None and fence not in self._unsettled}
+        self._unsettled.clear()
+
+    def next_block(self, start: int) -> Optional[CodeBlock]:
+        """First code block opening at or after `start` (blocks may overlap others)."""
+        for fence in self.fences[bisect.bisect_left(self.fences, start):]:
+            block = self.block_at(fence)
+            if block is not None:
+                return block
+        return None
+
+    def block_at(self, fence: int) -> Optional[CodeBlock]:
+        """
+        The code block opened by the fence at `fence`, or None.
+
+        The fence may carry a language word, then blank space containing at
+        least one newline; the content starts after the last such newline
+        (earlier ones are tried if no closing fence is found).
+        """
+        if fence in self._blocks:
+            return self._blocks[fence]
+        text = self.text
+        word_end = self._WORD.match(text, fence + 3).end()
+        space_end = self._SPACE.match(text, word_end).end()
+        block = None
+        last_newline = newline = text.rfind("\n", word_end, space_end)
+        while newline != -1:
+            close = self._close_after(newline + 1)
+            if close is not None:
+                block = CodeBlock(text[newline + 1:close[0]], fence, close[1])
+                if newline != last_newline:
+                    self._unsettled.add(fence) # A later closing fence could still match the preferred newline
+                break
+            newline = text.rfind("\n", word_end, newline)
+        self._blocks[fence] = block
+        return block
+
+    def settled(self, block: CodeBlock) -> bool:
+        """True if more text cannot change this block (always the case once the text is complete)."""
+        return block.start not in self._unsettled
+
+    def fenced_text(self, start: int) -> Optional[str]:
+        """Text from `start` (leading/trailing blank space excluded) to the next fence."""
+        start = self._SPACE.match(self.text, start).end()
+        end = self.text.find("```", start)
+        return None if end == -1 else self.text[start:end].rstrip()
+
+    def _title_span(self, heading: int) -> Optional[Tuple[int, int]]:
+        """
+        (start, end) of the heading's title, ending on a newline, or at the end
+        of the text if the line is not complete. None if it cannot be a section
+        title (no emoji, empty, or containing '#').
+        """
+        text = self.text
+        title_start = self._SPACE.match(text, heading + 2).end()
+        if title_start >= len(text):
+            return (title_start, title_start)
+        if text[title_start] not in self.SECTION_EMOJIS:
+            return None
+        title_end = self._TITLE.match(text, title_start + 1).end()
+        if title_end < len(text) and (title_end == title_start + 1 or text[title_end] != "\n"):
+            return None
+        return (title_start, title_end)
+
+    def _find_all(self, marker: str, start: int = 0) -> List[int]:
+        positions = []
+        position = self.text.find(marker, start)
+        while position != -1:
+            positions.append(position)
+            position = self.text.find(marker, position + 1)
+        return positions
+
+    def _close_after(self, start: int) -> Optional[Tuple[int, int]]:
+        """(content end, block end) of the first closing fence for content starting at `start`."""
+        text = self.text
+        for fence in self.fences[bisect.bisect_right(self.fences, start):]:
+            space_start = fence
+            while space_start > start and text[space_start - 1].isspace():
+                space_start -= 1
+            newline = text.find("\n", space_start, fence)
+            if newline != -1:
+                return newline, fence + 3
+        return None
 
 
 class ResultAdapter:
@@ -8,7 +313,22 @@ class ResultAdapter:
     Parses and structures raw Gemini output for UI consumption.
     Extracts JSON data and structured prompts from markdown-formatted responses.
     """
-    
+    # Standard tags used in our prompts, each moved to its own paragraph
+    PROMPT_TAGS = [
+        "SUBJECT", "MAIN SUBJECT", "MODEL SPECS",
+        "FASHION", "FETISH FASHION", "EXPERIMENTAL FASHION",
+        "POSE", "POV", "CONTEXT",
+        "LIGHTING", "VISUAL DETAILS", "TECHNICAL",
+        "STYLE", "AESTHETIC", "ENVIRONMENT", "TYPOGRAPHY",
+        "LOOK DESCRIPTION]"
+    ]
+    # "[TAG" preceded by a character other than a newline (so not at the start either)
+    _TAG_PATTERN = re.compile(r"(?<=[^\n])(\[(?:" + "|".join(map(re.escape, PROMPT_TAGS)) + "))", re.IGNORECASE)
+    LOOK_MARKER = re.compile(r"\*\*LOOK (\d+):") # ALT POV looks: **LOOK 7: ...
+    _LINE_COMMENT = re.compile(r"//.*")
+    _TRAILING_COMMA_OBJECT = re.compile(r",\s*\}")
+    _TRAILING_COMMA_ARRAY = re.compile(r",\s*\]")
+
     def __init__(self):
         pass
     
@@ -24,27 +344,47 @@ class ResultAdapter:
             {
                 'prompts': [(title, content), ...],
                 'json_data': {...} or None,
-                'raw_text': str
+                'raw_text': str,
+                'looks': {prompt index: {look number: (start, end)}, ...}
             }
         """
         result = {
             'prompts': [],
             'json_data': None,
-            'raw_text': text
+            'raw_text': text,
+            'looks': {}
         }
+        scanner = MarkdownScanner(text) # Shared by both extractions: the text is tokenized once
         
-        # Extract JSON if applicable
-        # Extract JSON if applicable
-        # Expanded list to include all modes that produce JSON data
         # Always attempt to extract JSON, regardless of mode
-        result['json_data'] = self.extract_json(text)
+        result['json_data'] = self.extract_json(text, scanner)
         
         # Extract structured prompts
-        result['prompts'] = self._extract_prompts(text)
+        result['prompts'] = self._extract_prompts(text, scanner)
+        
+        # Index ALT POV looks once, so views slice them instead of searching
+        for i, (_, content) in enumerate(result['prompts']):
+            looks = self.index_looks(content)
+            if looks:
+                result['looks'][i] = looks
         
         return result
     
-    def extract_json(self, text: str) -> Optional[Dict]:
+    def index_looks(self, content: str) -> Dict[int, Tuple[int, int]]:
+        """
+        Splits the looks of a prompt ("**LOOK 1: ...", "**LOOK 2: ...") in one scan.
+        
+        Returns:
+            {look number: (start, end)} spans in `content`. A look runs until the
+            next look marker (or the end); a repeated number keeps its first occurrence.
+        """
+        markers = list(self.LOOK_MARKER.finditer(content))
+        looks = {}
+        for marker, following in zip(markers, markers[1:] + [None]):
+            looks.setdefault(int(marker.group(1)), (marker.start(), following.start() if following else len(content)))
+        return looks
+    
+    def extract_json(self, text: str, scanner: Optional[MarkdownScanner] = None) -> Optional[Dict]:
         """
         Extracts and validates JSON from markdown code blocks.
         
@@ -56,22 +396,23 @@ class ResultAdapter:
         Returns:
             Parsed JSON dict or None if not found/invalid
         """
-        json_str = None
+        scanner = scanner or MarkdownScanner(text)
         
         # Strategy 1: Look for ```json block
-        match = re.search(r"```json\s*(.*?)\s*```", text, re.DOTALL)
-        if match:
-            json_str = match.group(1)
-            try:
-                return self._clean_and_parse(json_str)
-            except:
-                pass
+        for fence in scanner.fences:
+            if text.startswith("json", fence + 3):
+                json_str = scanner.fenced_text(fence + 7)
+                if json_str is not None:
+                    try:
+                        return self._clean_and_parse(json_str)
+                    except:
+                        pass
+                break
 
         # Strategy 2: Look for first ``` block
-        match = re.search(r"```\s*(.*?)\s*```", text, re.DOTALL)
-        if match:
-            candidate = match.group(1).strip()
-            if candidate.startswith('{'):
+        if scanner.fences:
+            candidate = scanner.fenced_text(scanner.fences[0] + 3)
+            if candidate is not None and candidate.startswith('{'):
                 try:
                     return self._clean_and_parse(candidate)
                 except:
@@ -79,8 +420,8 @@ class ResultAdapter:
 
         # Strategy 3: Robust Raw Decode (The "Magic" Solution)
         # Finds the first '{' and parses until valid JSON end, ignoring trailing text.
+        start_idx = text.find('{')
         try:
-            start_idx = text.find('{')
             if start_idx != -1:
                 # raw_decode returns (obj, end_index)
                 obj, _ = json.JSONDecoder().raw_decode(text, start_idx)
@@ -89,12 +430,12 @@ class ResultAdapter:
             # print(f"Raw Decode Failed: {e}") # Silenced for production
             pass
             
-            # Strategy 4: Fallback to greedy regex (Last Resort)
+            # Strategy 4: Fallback to outermost braces (Last Resort)
             # Only if raw_decode failed (e.g. due to comments or bad formatting inside)
-            match = re.search(r"\{.*\}", text, re.DOTALL)
-            if match:
+            end_idx = text.rfind('}')
+            if end_idx > start_idx:
                 try:
-                    return self._clean_and_parse(match.group(0))
+                    return self._clean_and_parse(text[start_idx:end_idx + 1])
                 except:
                     pass
         
@@ -105,13 +446,13 @@ class ResultAdapter:
         # Basic cleanup
         json_str = json_str.strip()
         # Remove C-style comments // ...
-        json_str = re.sub(r"//.*", "", json_str)
+        json_str = self._LINE_COMMENT.sub("", json_str)
         # Remove trailing commas
-        json_str = re.sub(r",\s*\}", "}", json_str)
-        json_str = re.sub(r",\s*\]", "]", json_str)
+        json_str = self._TRAILING_COMMA_OBJECT.sub("}", json_str)
+        json_str = self._TRAILING_COMMA_ARRAY.sub("]", json_str)
         return json.loads(json_str)
     
-    def _extract_prompts(self, text: str) -> List[Tuple[str, str]]:
+    def _extract_prompts(self, text: str, scanner: Optional[MarkdownScanner] = None) -> List[Tuple[str, str]]:
         """
         Extracts structured prompts from text.
         
@@ -121,60 +462,171 @@ class ResultAdapter:
         Returns:
             List of (title, content) tuples
         """
-        prompts = []
-        
-        # Extract all code blocks first
-        code_blocks = re.findall(r'```(?:\w+)?\s*\n(.*?)\n\s*```', text, re.DOTALL)
-        
-        if not code_blocks:
-            return prompts
+        scanner = scanner or MarkdownScanner(text)
         
         # Try to identify prompt types by looking for headers
-        section_pattern = r'##\s*([🎯📸🧠🚀⚡💎🔥🔬][^#\n]+)\s*\n.*?```(?:\w+)?\s*\n(.*?)\n\s*```'
-        matches = re.finditer(section_pattern, text, re.DOTALL)
-        
-        for match in matches:
-            title = match.group(1).strip()
-            content = match.group(2).strip()
-            prompts.append((title, content))
+        prompts = [(section.title, section.block.content.strip()) for section in scanner.sections()]
         
         # Fallback: If no sections found, just number the blocks
         if not prompts:
-            prompts = [(f"📝 Prompt {i+1}", block.strip()) for i, block in enumerate(code_blocks)]
+            prompts = [(f"📝 Prompt {i+1}", block.content.strip()) for i, block in enumerate(scanner.code_blocks())]
         
         # Apply formatting to all extracted prompts
-        formatted_prompts = []
-        for title, content in prompts:
-            formatted_content = self._format_prompt_multiline(content)
-            formatted_prompts.append((title, formatted_content))
-            
-        return formatted_prompts
+        return [(title, self._format_prompt_multiline(content)) for title, content in prompts]
 
     def _format_prompt_multiline(self, text: str) -> str:
         """
         Automatically inserts newlines before section tags to ensure readability.
         Target tags: [SUBJECT], [LIGHTING], [STYLE], [POSE], etc.
         """
-        # List of standard tags used in our prompts
-        tags = [
-            r"\[SUBJECT", r"\[MAIN SUBJECT", r"\[MODEL SPECS", 
-            r"\[FASHION", r"\[FETISH FASHION", r"\[EXPERIMENTAL FASHION",
-            r"\[POSE", r"\[POV", r"\[CONTEXT", 
-            r"\[LIGHTING", r"\[VISUAL DETAILS", r"\[TECHNICAL",
-            r"\[STYLE", r"\[AESTHETIC", r"\[ENVIRONMENT", r"\[TYPOGRAPHY",
-            r"\[LOOK DESCRIPTION]"
-        ]
-        
-        formatted_text = text
-        
-        for tag in tags:
-            # Look for the tag preceded by something other than a newline (and not at start of string)
-            # We replace it with \n\n[TAG...
-            pattern = f"(?<!^)(?<!\\n)({tag})"
-            formatted_text = re.sub(pattern, r"\n\n\1", formatted_text, flags=re.IGNORECASE)
-            
-            # Also handle cases where it's just a single newline, force double
-            pattern_single = f"(?<!^)(?<!\\n)(\\n)({tag})"
-            formatted_text = re.sub(pattern_single, r"\n\2", formatted_text, flags=re.IGNORECASE)
+        # A tag preceded by something other than a newline (and not at start of string) becomes \n\n[TAG...
+        return self._TAG_PATTERN.sub(r"\n\n\1", text)
+
+
+class StreamingResultParser:
+    """
+    Incremental counterpart of ResultAdapter._extract_prompts.
+
+    Chunks are fed as they stream; a section or code block is emitted as soon
+    as its closing fence arrives, so finished prompts can be shown while the
+    rest is still generating. Completed blocks never change with more text,
+    so emitted prompts are final, and once the stream is complete `prompts`
+    equals parse_response()['prompts'] (sections if the response has any,
+    otherwise the numbered code blocks). Text is only re-scanned when a chunk
+    may have completed a fence. ALT POV looks are tracked as well: a look of
+    the prompt still being written is complete once the next one starts
+    (see open_looks()).
+    """
+    _MARKER_CARRY = 16 # Chars kept from the previous chunk to find a look marker split across chunks
+
+    def __init__(self, adapter: Optional[ResultAdapter] = None):
+        self.adapter = adapter or ResultAdapter()
+        self.scanner = MarkdownScanner("")
+        self.sections: List[Section] = []
+        self.blocks: List[CodeBlock] = []
+        self._pending: List[str] = []
+        self._heading_index = 0 # Next heading to try
+        self._fence_index = 0 # Next fence to try as a standalone block
+        self._formatted: Dict[int, str] = {} # Block start -> formatted content
+        self._closed = False
+        self._fed = 0 # Stream length
+        self._carry = ""
+        self.look_markers: List[Tuple[int, int]] = [] # (look number, stream offset) of every look marker
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        return self.scanner.text + "".join(self._pending)
+
+    @property
+    def prompts(self) -> List[Tuple[str, str]]:
+        """(title, content) of the prompts completed so far, formatted like parse_response."""
+        if self.sections:
+            return [(section.title, self._format(section.block)) for section in self.sections]
+        return [(f"📝 Prompt {i+1}", self._format(block)) for i, block in enumerate(self.blocks)]
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        """
+        Consumes a chunk.
+
+        Returns:
+            The prompts completed by this chunk. When the first section completes,
+            the numbered blocks shown so far are superseded: check `prompts`.
+        """
+        self._pending.append(chunk)
+        self._find_look_markers(chunk)
+        if "`" not in chunk: # Nothing can complete without a new fence
+            return []
+        return self._advance()
+
+    def open_looks(self) -> List[Tuple[int, str]]:
+        """
+        (number, text) of the finished looks in the text after the last completed
+        prompt, i.e. in the one still being generated. A look is finished once
+        the next look marker has arrived.
+        """
+        self._materialize()
+        tail_start = max([block.end for block in self.blocks[-1:]] + [section.block.end for section in self.sections[-1:]] + [0])
+        markers = [offset for _, offset in self.look_markers if offset >= tail_start]
+        if len(markers) < 2:
+            return []
+        finished = self.adapter._format_prompt_multiline(self.scanner.text[markers[0]:markers[-1]])
+        return [(number, finished[start:end].strip()) for number, (start, end) in self.adapter.index_looks(finished).items()]
+
+    def close(self) -> List[Tuple[str, str]]:
+        """Ends the stream. Returns the prompts completed by the rest of the text."""
+        self._closed = True
+        return self._advance()
+
+    def _materialize(self):
+        if self._pending:
+            self.scanner.extend("".join(self._pending))
+            self._pending = []
+
+    def _find_look_markers(self, chunk: str):
+        window = self._carry + chunk
+        window_start = self._fed - len(self._carry)
+        for marker in self.adapter.LOOK_MARKER.finditer(window):
+            if marker.end() > len(self._carry): # Not already found in the previous window
+                self.look_markers.append((int(marker.group(1)), window_start + marker.start()))
+        self._fed += len(chunk)
+        self._carry = window[-self._MARKER_CARRY:]
+
+    def _advance(self) -> List[Tuple[str, str]]:
+        self._materialize()
+        had_sections = bool(self.sections)
+        new_sections = self._advance_sections()
+        new_blocks = self._advance_blocks()
+        if new_sections:
+            return self.prompts if not had_sections else [
+                (section.title, self._format(section.block)) for section in new_sections
+            ]
+        if self.sections:
+            return []
+        start = len(self.blocks) - len(new_blocks)
+        return [(f"📝 Prompt {start + i + 1}", self._format(block)) for i, block in enumerate(new_blocks)]
+
+    def _advance_sections(self) -> List[Section]:
+        scanner = self.scanner
+        found = []
+        while self._heading_index < len(scanner.headings):
+            heading = scanner.headings[self._heading_index]
+            if self.sections and heading < self.sections[-1].block.end:
+                self._heading_index += 1
+                continue
+            section = scanner.section_at(heading)
+            if section is None:
+                if scanner.section_pending(heading) and not self._closed:
+                    break # May still match once more text arrives
+                self._heading_index += 1
+                continue
+            if not (self._closed or scanner.settled(section.block)):
+                break
+            self.sections.append(section)
+            found.append(section)
+            self._heading_index += 1
+        return found
+
+    def _advance_blocks(self) -> List[CodeBlock]:
+        scanner = self.scanner
+        found = []
+        while True:
+            start = self.blocks[-1].end if self.blocks else 0
+            index = bisect.bisect_left(scanner.fences, start, self._fence_index)
+            block = None
+            # The first block to open: an earlier fence that failed can only
+            # still succeed if no later fence has (it would close on the same fence)
+            for fence in scanner.fences[index:]:
+                block = scanner.block_at(fence)
+                if block is not None:
+                    break
+            if block is None or not (self._closed or scanner.settled(block)):
+                self._fence_index = index
+                return found
+            self.blocks.append(block)
+            found.append(block)
 
-        return formatted_text
+    def _format(self, block: CodeBlock) -> str:
+        if block.start not in self._formatted:
+            self._formatted[block.start] = self.adapter._format_prompt_multiline(block.content.strip())
+        return self._formatted[block.start]
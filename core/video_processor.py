@@ -1,76 +1,563 @@
 import cv2
+import numpy as np
 from PIL import Image
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import hashlib
 import tempfile
+import time
 import os
+from typing import NamedTuple, Optional
+
+# Uploads are spooled here once and reused across extractions of the same file
+SPOOL_DIR = os.path.join(tempfile.gettempdir(), "artidicia_spool")
+
+
+class ExtractedFrame(NamedTuple):
+    """A decoded frame with its position in the video."""
+    index: int # Frame number in the video
+    timestamp: Optional[float] # Seconds from the start (None if unknown)
+    image: Image.Image
+
+
+class _UnreliableSeek(Exception):
+    """Raised when the container does not land on the requested frame."""
+
 
 class VideoProcessor:
-    def __init__(self, extraction_interval=2):
+    # Uploads are copied to disk in chunks of this size (peak memory stays constant)
+    SPOOL_CHUNK_SIZE = 8 * 1024 * 1024
+    # Spooled files untouched for this long are removed on the next spool
+    SPOOL_MAX_AGE_SECONDS = 24 * 3600
+
+    # Gaps shorter than this (in seconds) are skipped with grab() instead of a seek:
+    # a seek re-decodes from the previous keyframe, which costs more than a few grabs.
+    GRAB_WINDOW_SECONDS = 1.0
+
+    # Scene detection: frames analysed per second, thumbnail size and histogram bins per channel
+    SCENE_SAMPLES_PER_SECOND = 4
+    SCENE_THUMB_SIZE = (32, 18)
+    SCENE_HIST_BINS = 8
+    # Shots shorter than this are merged into the previous one (flashes, fast pans)
+    SCENE_MIN_SHOT_SECONDS = 0.5
+
+    def __init__(self, extraction_interval=2, seek=True, cache=None, scene_threshold=0.3,
+                 parallel=False, workers=None, max_dimension=None):
         """
         Args:
             extraction_interval (int): Extract 1 frame every N seconds.
+            seek (bool): Jump straight to the target frames instead of decoding
+                the whole video. Falls back to sequential decoding automatically
+                when the container does not support reliable seeking.
+            cache (FrameCache): Optional content-addressed frame cache. Extractions
+                of already processed footage with the same settings skip decoding.
+            scene_threshold (float): Cut detection sensitivity for the "scenes"
+                strategy (0-1, lower detects more cuts).
+            parallel (bool): Split the timeline into segments and decode them in a
+                process pool (one capture per worker), merged in timestamp order.
+            workers (int): Pool size for parallel mode (None or 0 = CPU count).
+            max_dimension (int): Downscale frames at decode time so their longest
+                side is at most this many pixels (None = keep source resolution).
+                Vision models downsample to ~1 MP anyway; use extract_originals()
+                when full resolution is actually needed.
         """
         self.extraction_interval = extraction_interval
+        self.seek = seek
+        self.cache = cache
+        self.scene_threshold = scene_threshold
+        self.parallel = parallel
+        self.workers = workers or os.cpu_count() or 1
+        self.max_dimension = max_dimension
 
     def process_video(self, video_file, strategy="interval", value=2):
         """
         Process a video file and extract frames.
-        
+
         Args:
-            video_file: Streamlit UploadedFile.
-            strategy (str): "interval" (seconds) or "count" (total frames).
-            value (int): The interval in seconds OR the total number of frames.
-        
+            video_file: Streamlit UploadedFile, or a path to a video on disk.
+            strategy (str): "interval" (seconds), "count" (total frames) or
+                "scenes" (one representative frame per shot).
+            value (int): The interval in seconds OR the total number of frames
+                OR the maximum number of shots.
+
         Returns:
             list: List of PIL Image objects.
         """
-        # Save uploaded file to temp file because cv2 needs a path
-        tfile = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4')
-        tfile.write(video_file.read())
-        tfile.close()
-        
-        frames = []
-        cap = cv2.VideoCapture(tfile.name)
-        
+        return [frame.image for frame in self.iter_frames(video_file, strategy, value)]
+
+    def iter_frames(self, video_file, strategy="interval", value=2):
+        """
+        Extracts frames like process_video, but yields each one as soon as it is
+        decoded so callers can render or encode early frames while later ones
+        are still decoding.
+
+        Args:
+            video_file: Streamlit UploadedFile, or a path to a video on disk.
+            strategy (str): "interval", "count" or "scenes" (see process_video).
+            value (int): Strategy parameter (see process_video).
+
+        Yields:
+            ExtractedFrame: (index, timestamp, image) in timestamp order.
+        """
+        # cv2 needs a path: reuse the spooled copy of the upload (or the file itself)
+        video_path = self.spool(video_file)
+
+        cache_key = None
+        if self.cache is not None:
+            video_digest = self.cache.video_digest(video_path)
+            cache_key = self.cache.make_key(video_digest, **self._cache_params(strategy, value))
+            cached = self.cache.load(cache_key)
+            if cached is not None:
+                cached_frames, metadata = cached
+                positions = metadata.get("positions") or [(i, None) for i in range(len(cached_frames))]
+                for (index, timestamp), image in zip(positions, cached_frames):
+                    yield ExtractedFrame(index, timestamp, image)
+                return
+
+        cap = cv2.VideoCapture(video_path)
         fps = cap.get(cv2.CAP_PROP_FPS)
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        duration = total_frames / fps if fps > 0 else 0
-        
+        cap.release()
+
         if fps == 0:
             fps = 30 # Fallback
-            
+
         # Calculate Frame Interval
-        if strategy == "count":
+        if strategy == "scenes":
+            target_count = None
+            frame_interval = max(1, int(fps)) # Only used if the frame count is unknown
+        elif strategy == "count":
             target_count = max(1, int(value))
             if total_frames > 0:
                 frame_interval = max(1, int(total_frames / target_count))
             else:
                 frame_interval = int(fps) # Fallback
         else: # strategy == "interval"
+            target_count = None
             interval_sec = max(0.1, float(value))
             frame_interval = max(1, int(fps * interval_sec))
-        
+
+        if strategy == "scenes":
+            targets = self._detect_scene_targets(video_path, fps, total_frames, max(1, int(value)))
+            target_count = len(targets)
+        else:
+            targets = self._target_indices(total_frames, frame_interval, target_count)
+
+        extracted = []
+
+        if self.parallel and self.workers > 1 and targets and len(targets) > 1:
+            # Plain ints: np.int64 indices would leak into ExtractedFrame and the cache metadata (JSON)
+            segments = [[int(i) for i in chunk] for chunk in np.array_split(targets, min(self.workers, len(targets)))]
+            try:
+                for segment_frames in self._iter_parallel(
+                    _extract_segment,
+                    [(video_path, segment, fps, self.seek, self.max_dimension) for segment in segments]
+                ):
+                    for index, image in segment_frames:
+                        extracted.append(ExtractedFrame(index, index / fps, image))
+                        yield extracted[-1]
+                targets = [] # All done
+            except (OSError, BrokenProcessPool) as e:
+                print(f"⚠️ Parallel decoding unavailable, using a single process: {e}")
+                # Finish the remaining targets in this process
+                if extracted:
+                    targets = [t for t in targets if t > extracted[-1].index]
+                    target_count = len(targets)
+
+        if targets or not extracted:
+            for index, image in self._iter_targets(video_path, targets, fps, frame_interval, target_count):
+                extracted.append(ExtractedFrame(index, index / fps, image))
+                yield extracted[-1]
+
+        if cache_key is not None and extracted:
+            metadata = self._cache_params(strategy, value)
+            metadata["positions"] = [(frame.index, frame.timestamp) for frame in extracted]
+            try:
+                self.cache.put(cache_key, [frame.image for frame in extracted], metadata=metadata)
+            except OSError as e:
+                print(f"⚠️ Could not write frame cache: {e}")
+
+    def extract_originals(self, video_file, indices):
+        """
+        Re-extracts frames at full source resolution (e.g. to save them to disk
+        when the analysis frames were downscaled at decode time).
+
+        Args:
+            video_file: Streamlit UploadedFile, or a path to a video on disk.
+            indices (list): Frame indices, as reported by iter_frames.
+
+        Returns:
+            list: PIL Images in the order of `indices`.
+        """
+        video_path = self.spool(video_file)
+
+        cap = cv2.VideoCapture(video_path)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30
+        cap.release()
+
+        targets = sorted(set(indices))
+        full_resolution = VideoProcessor(seek=self.seek)
+        decoded = dict(full_resolution._iter_targets(video_path, targets, fps, target_count=len(targets)))
+        return [decoded[i] for i in indices if i in decoded]
+
+    def spool(self, video_file):
+        """
+        Returns a path OpenCV can open for the given video.
+
+        Paths are used in place (no copy). Uploaded files are streamed to
+        SPOOL_DIR in fixed-size chunks and the spooled copy is reused by later
+        calls for the same upload (same Streamlit file_id), so repeated
+        extractions don't rewrite it. Other file objects are copied on every
+        call and named after a hash of their content.
+
+        Args:
+            video_file: Streamlit UploadedFile (or any binary file-like object),
+                or a path to a video on disk.
+
+        Returns:
+            str: Path to the video file.
+        """
+        if isinstance(video_file, (str, os.PathLike)):
+            path = os.fspath(video_file)
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Video file not found: {path}")
+            return path
+
+        name = getattr(video_file, "name", "") or ""
+        suffix = os.path.splitext(name)[1].lower() or ".mp4"
+        os.makedirs(SPOOL_DIR, exist_ok=True)
+
+        # Streamlit gives every upload a unique file_id: reuse its copy without reading it again
+        file_id = getattr(video_file, "file_id", None)
+        if file_id:
+            key = hashlib.sha1(str(file_id).encode("utf-8")).hexdigest()[:20]
+            path = os.path.join(SPOOL_DIR, key + suffix)
+            if os.path.exists(path):
+                os.utime(path) # Keep it alive for the cleanup below
+                return path
+
+        self._cleanup_spool()
+
+        # Write to a partial file then rename, so a crash never leaves a truncated video behind.
+        # Other file objects have no stable identity: they are keyed by a hash of their content.
+        partial = tempfile.NamedTemporaryFile(delete=False, dir=SPOOL_DIR, suffix=".part")
+        try:
+            digest = hashlib.sha1()
+            with partial:
+                if hasattr(video_file, "seek"):
+                    video_file.seek(0)
+                while True:
+                    chunk = video_file.read(self.SPOOL_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    partial.write(chunk)
+            if not file_id:
+                path = os.path.join(SPOOL_DIR, digest.hexdigest()[:20] + suffix)
+            os.replace(partial.name, path)
+        except BaseException:
+            if os.path.exists(partial.name):
+                os.unlink(partial.name)
+            raise
+
+        return path
+
+    def _cleanup_spool(self):
+        """Removes spooled uploads that have not been used for a while."""
+        cutoff = time.time() - self.SPOOL_MAX_AGE_SECONDS
+        for entry in os.scandir(SPOOL_DIR):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+            except OSError:
+                pass # In use or already removed by another session
+
+    def _cache_params(self, strategy, value):
+        """Extraction parameters that affect the output (part of the frame cache key)."""
+        params = {"strategy": strategy, "value": value, "max_dimension": self.max_dimension}
+        if strategy == "scenes":
+            params["scene_threshold"] = self.scene_threshold
+        return params
+
+    def _iter_parallel(self, fn, jobs):
+        """
+        Runs fn(*job) for every job in a process pool, yielding results in job
+        order as soon as each one (and all the previous ones) are done.
+        """
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs))) as pool:
+            yield from pool.map(fn, *zip(*jobs))
+
+    def _run_parallel(self, fn, jobs):
+        """
+        Runs fn(*job) for every job in a process pool.
+
+        Returns:
+            list: Results in job order, or None if the pool could not run
+            (caller falls back to single-process decoding).
+        """
+        try:
+            return list(self._iter_parallel(fn, jobs))
+        except (OSError, BrokenProcessPool) as e:
+            print(f"⚠️ Parallel decoding unavailable, using a single process: {e}")
+            return None
+
+    def _iter_targets(self, video_path, targets, fps, frame_interval=1, target_count=None):
+        """
+        Yields (index, image) for the target frames with a single capture: seek
+        first, then sequential decoding of the remaining targets if seeking turns
+        out to be unreliable for this container.
+        """
+        cap = cv2.VideoCapture(video_path)
+        try:
+            if self.seek and targets:
+                done = 0
+                try:
+                    for index, image in self._iter_by_seek(cap, targets, fps):
+                        done += 1
+                        yield index, image
+                    return
+                except _UnreliableSeek:
+                    # Restart from the beginning for the targets not extracted yet
+                    cap.release()
+                    cap = cv2.VideoCapture(video_path)
+                    targets = targets[done:]
+                    target_count = len(targets)
+
+            yield from self._iter_sequential(cap, frame_interval, target_count, targets)
+        finally:
+            cap.release()
+
+    def _detect_scene_targets(self, video_path, fps, total_frames, max_shots):
+        """
+        Detects shot boundaries and returns one representative frame index per shot.
+
+        The video is sampled a few times per second; each sample is reduced to a
+        tiny thumbnail. Cut scores between consecutive samples combine a
+        downscaled pixel difference and a color histogram distance, both
+        computed in NumPy over all samples at once.
+
+        Returns:
+            list: Sorted frame indices (at most max_shots).
+        """
+        step = max(1, int(round(fps / self.SCENE_SAMPLES_PER_SECOND)))
+
+        results = None
+        if self.parallel and self.workers > 1 and total_frames > step * self.workers:
+            # Segment boundaries aligned on the sampling step so samples match the sequential pass
+            segment_length = -(-total_frames // (self.workers * step)) * step
+            starts = range(0, total_frames, segment_length)
+            results = self._run_parallel(
+                _sample_segment,
+                [(video_path, step, start, start + segment_length) for start in starts]
+            )
+
+        if results is None:
+            results = [self._sample_thumbnails(video_path, step)]
+
+        sample_indices = [index for indices, _ in results for index in indices]
+        thumbnails = [thumb for _, thumbs in results for thumb in thumbs]
+
+        if not thumbnails:
+            return []
+
+        sample_indices = np.asarray(sample_indices)
+        thumbs = np.stack(thumbnails) # (N, H, W, 3) uint8
+        n_samples = len(thumbs)
+        if n_samples == 1:
+            return [int(sample_indices[0])]
+
+        # 1. Mean absolute pixel difference between consecutive thumbnails (0-1)
+        flat = thumbs.reshape(n_samples, -1).astype(np.float32)
+        pixel_diff = np.abs(np.diff(flat, axis=0)).mean(axis=1) / 255.0
+
+        # 2. Joint color histogram per sample, built with a single bincount
+        bins = self.SCENE_HIST_BINS
+        quantized = (thumbs // (256 // bins)).astype(np.int64)
+        codes = (quantized[..., 0] * bins + quantized[..., 1]) * bins + quantized[..., 2]
+        codes = codes.reshape(n_samples, -1) + np.arange(n_samples)[:, None] * bins ** 3
+        hists = np.bincount(codes.ravel(), minlength=n_samples * bins ** 3)
+        hists = hists.reshape(n_samples, bins ** 3) / codes.shape[1]
+        hist_diff = np.abs(np.diff(hists, axis=0)).sum(axis=1) / 2.0 # L1 / 2 -> 0-1
+
+        scores = 0.5 * pixel_diff + 0.5 * hist_diff # scores[i]: cut between sample i and i + 1
+
+        # Candidate cuts, strongest first, with a minimum shot length
+        min_gap = max(1, int(self.SCENE_MIN_SHOT_SECONDS * self.SCENE_SAMPLES_PER_SECOND))
+        candidates = np.flatnonzero(scores > self.scene_threshold)
+        candidates = candidates[np.argsort(scores[candidates])[::-1]]
+
+        cuts = []
+        for c in candidates:
+            if len(cuts) >= max_shots - 1:
+                break
+            if all(abs(int(c) - other) >= min_gap for other in cuts):
+                cuts.append(int(c))
+
+        # Shot boundaries as sample ranges [start, end)
+        starts = [0] + sorted(c + 1 for c in cuts)
+        ends = starts[1:] + [n_samples]
+
+        # Representative = sample closest to the shot's mean thumbnail
+        targets = []
+        for start, end in zip(starts, ends):
+            shot = flat[start:end]
+            distances = np.abs(shot - shot.mean(axis=0)).mean(axis=1)
+            targets.append(int(sample_indices[start + int(np.argmin(distances))]))
+
+        return targets
+
+    def _sample_thumbnails(self, video_path, step, start=0, end=None):
+        """
+        Decodes frames [start, end) and keeps a tiny thumbnail of every step-th frame.
+
+        Returns:
+            tuple: (frame indices, BGR thumbnails)
+        """
+        cap = cv2.VideoCapture(video_path)
         count = 0
-        extracted_count = 0
-        
-        while cap.isOpened():
+        if start > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+            if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == start:
+                count = start
+            else:
+                # Unreliable seek: decode from the beginning, skipping up to start
+                cap.release()
+                cap = cv2.VideoCapture(video_path)
+
+        sample_indices = []
+        thumbnails = []
+        try:
+            while end is None or count < end:
+                if not cap.grab():
+                    break
+                if count >= start and count % step == 0:
+                    ret, frame = cap.retrieve()
+                    if not ret:
+                        break
+                    thumbnails.append(cv2.resize(frame, self.SCENE_THUMB_SIZE, interpolation=cv2.INTER_AREA))
+                    sample_indices.append(count)
+                count += 1
+        finally:
+            cap.release()
+
+        return sample_indices, thumbnails
+
+    def _target_indices(self, total_frames, frame_interval, target_count=None):
+        """
+        Computes the frame indices to extract.
+
+        Returns:
+            list: Sorted frame indices, or None when the frame count is unknown
+            (some containers report 0 or garbage), in which case the caller must
+            decode sequentially.
+        """
+        if total_frames <= 0:
+            return None
+
+        targets = list(range(0, total_frames, frame_interval))
+        if target_count is not None:
+            targets = targets[:target_count]
+        return targets
+
+    def _iter_by_seek(self, cap, targets, fps):
+        """
+        Yields (index, image) for the target frames by seeking, so the cost
+        scales with the number of frames wanted rather than with the video length.
+
+        Short gaps are skipped with grab() (demux + decode, no retrieval or
+        color conversion), long gaps use a keyframe seek.
+
+        Raises:
+            _UnreliableSeek: The container reported an inconsistent position after
+            a seek (caller should fall back to sequential decoding).
+        """
+        grab_window = max(1, int(fps * self.GRAB_WINDOW_SECONDS))
+        position = 0 # Index of the next frame read() would return
+        extracted = 0
+
+        for target in targets:
+            gap = target - position
+            if 0 <= gap <= grab_window:
+                for _ in range(gap):
+                    if not cap.grab():
+                        if extracted:
+                            return
+                        raise _UnreliableSeek()
+            else:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) != target:
+                    raise _UnreliableSeek()
+
             ret, frame = cap.read()
             if not ret:
+                # Reported frame count is often slightly larger than the real one:
+                # a failed read past the first frame just means we hit the end.
+                if extracted:
+                    return
+                raise _UnreliableSeek()
+
+            yield target, self._to_pil(frame)
+            extracted += 1
+            position = target + 1
+
+    def _iter_sequential(self, cap, frame_interval, target_count=None, targets=None):
+        """
+        Decodes the video frame by frame, yielding (index, image). Only the
+        selected frames are retrieved and converted; the others are skipped
+        with grab().
+        """
+        extracted = 0
+        wanted = set(targets) if targets else None
+        last_target = targets[-1] if targets else None
+        count = 0
+
+        while cap.isOpened():
+            if wanted is not None:
+                is_target = count in wanted
+            else:
+                is_target = count % frame_interval == 0
+
+            if not cap.grab():
                 break
-                
-            if count % frame_interval == 0:
-                # Convert BGR to RGB
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                pil_image = Image.fromarray(rgb_frame)
-                frames.append(pil_image)
-                extracted_count += 1
-                
+
+            if is_target:
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                yield count, self._to_pil(frame)
+                extracted += 1
+
                 # Stop if we hit the target count (only for count strategy to be precise)
-                if strategy == "count" and extracted_count >= value:
+                if target_count is not None and extracted >= target_count:
+                    break
+                if last_target is not None and count >= last_target:
                     break
-            
+
             count += 1
-            
-        cap.release()
-        os.unlink(tfile.name) # Clean up temp file
-        
-        return frames
+
+    def _to_pil(self, frame):
+        """
+        Converts an OpenCV BGR frame to a PIL Image, downscaling the NumPy array
+        first if max_dimension is set (the full-resolution RGB copy is never made).
+        """
+        if self.max_dimension:
+            height, width = frame.shape[:2]
+            scale = self.max_dimension / max(height, width)
+            if scale < 1:
+                size = (max(1, round(width * scale)), max(1, round(height * scale)))
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        return Image.fromarray(rgb_frame)
+
+
+# Process pool entry points (must be module-level to be picklable)
+
+def _extract_segment(video_path, targets, fps, seek, max_dimension):
+    """Extracts one contiguous segment of target frames in a worker process."""
+    processor = VideoProcessor(seek=seek, max_dimension=max_dimension)
+    return list(processor._iter_targets(video_path, targets, fps, target_count=len(targets)))
+
+
+def _sample_segment(video_path, step, start, end):
+    """Samples scene-detection thumbnails for one timeline segment in a worker process."""
+    return VideoProcessor()._sample_thumbnails(video_path, step, start, end)
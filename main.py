@@ -1,6 +1,107 @@
-def main():
-    print("Hello from frames-analyzer-V3!")
+import argparse
+import os
+import sys
+import time
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="artidicia",
+        description="Headless batch analysis of image/video folders (no browser needed)."
+    )
+    parser.add_argument("inputs", nargs="+", help="Files, directories or glob patterns (e.g. 'shoots/**/*.jpg').")
+    parser.add_argument("-m", "--mode", required=True, help="Analysis mode key from config/prompts.yaml.")
+    parser.add_argument("--model", help="Ollama model (default: model.name from settings).")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl",
+                        help="JSONL output; re-running with the same file resumes the batch.")
+    parser.add_argument("-w", "--workers", type=int, default=2, help="Inputs analyzed concurrently.")
+    parser.add_argument("--style", help="Style for style_transfer_pro.")
+    parser.add_argument("--instruction", default="", help="Custom instruction appended to every prompt.")
+    parser.add_argument("--strategy", choices=["interval", "count", "scenes"], default="count",
+                        help="Frame extraction strategy for videos.")
+    parser.add_argument("--value", type=float, default=5,
+                        help="Seconds between frames (interval) or number of frames (count, scenes).")
+    parser.add_argument("--temperature", type=float, help="Sampling temperature (default: from settings).")
+    parser.add_argument("--no-db", action="store_true", help="Do not save results to history.db.")
+    parser.add_argument("--no-recursive", action="store_true", help="Do not descend into sub-directories.")
+    parser.add_argument("--settings", default="config/settings.yaml")
+    parser.add_argument("--prompts", default="config/prompts.yaml")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    from core.batch_runner import BatchRunner, discover_inputs
+    from core.database import DatabaseManager
+    from core.frame_cache import FrameCache
+    from core.image_encoder import ImageEncoder
+    from core.ollama_adapter import OllamaAdapter, client_from_settings
+    from core.prompt_manager import YamlPromptLoader
+    from core.video_processor import VideoProcessor
+
+    settings, prompts = YamlPromptLoader(args.settings, args.prompts).load_config()
+    if args.mode not in prompts.get("analysis_modes", {}):
+        print(f"❌ Unknown mode '{args.mode}'. Available: {', '.join(prompts['analysis_modes'])}")
+        return 2
+
+    inputs = discover_inputs(args.inputs, recursive=not args.no_recursive)
+    if not inputs:
+        print("❌ No images or videos found.")
+        return 1
+
+    model_settings = settings.get('model', {})
+    video_settings = settings.get('video', {})
+    model = OllamaAdapter(
+        model_name=args.model or model_settings.get('name'),
+        temperature=args.temperature if args.temperature is not None else model_settings.get('temperature', 0.7),
+        encoder=ImageEncoder.from_settings(settings, args.mode),
+        client=client_from_settings(settings),
+        keep_alive=model_settings.get('keep_alive')
+    )
+    video_processor = VideoProcessor(
+        cache=FrameCache(
+            cache_dir=video_settings.get('cache_dir', '.cache/frames'),
+            max_size_mb=video_settings.get('cache_max_mb', 512)
+        ),
+        scene_threshold=video_settings.get('scene_threshold', 0.3),
+        max_dimension=video_settings.get('max_dimension')
+    )
+    strategy_value = args.value if args.strategy == "interval" else int(args.value)
+
+    runner = BatchRunner(
+        model=model,
+        prompts=prompts,
+        mode=args.mode,
+        output_path=args.output,
+        video_processor=video_processor,
+        strategy=args.strategy,
+        strategy_value=strategy_value,
+        style=args.style,
+        custom_instruction=args.instruction,
+        db=None if args.no_db else DatabaseManager(),
+        workers=args.workers
+    )
+
+    print(f"🚀 {len(inputs)} input(s) | mode: {args.mode} | model: {model.model_name} | output: {args.output}")
+    start = time.perf_counter()
+
+    def on_progress(done, total, record):
+        status = "✅" if record['status'] == 'ok' else f"❌ {record.get('error')}"
+        print(f"[{done}/{total}] {status} {os.path.basename(record['input'])} ({record['elapsed']:.1f}s)")
+
+    try:
+        stats = runner.run(inputs, on_progress=on_progress)
+    except KeyboardInterrupt:
+        print("\n⏸️ Interrupted. Re-run the same command to resume.")
+        return 130
+
+    print(
+        f"🏁 Done in {time.perf_counter() - start:.1f}s: {stats['ok']} ok, {stats['failed']} failed, "
+        f"{stats['skipped']} already done"
+    )
+    return 1 if stats['failed'] else 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,52 @@
+import yaml
+from PIL import Image
+
+from core.batch_runner import BatchRunner
+from core.image_encoder import ImageEncoder
+
+
+class FakeModel:
+    model_name = "fake"
+
+    def __init__(self, temperature=0.7, encoder=None):
+        self.temperature = temperature
+        self.encoder = encoder or ImageEncoder()
+        self.calls = 0
+
+    def analyze(self, images, prompt, stream=False):
+        self.calls += 1
+        yield "```\nprompt\n```"
+
+
+class FakeVideoProcessor:
+    max_dimension = None
+    scene_threshold = 0.3
+
+    def process_video(self, path, strategy, value):
+        return [Image.new("RGB", (16, 16))]
+
+
+def make_runner(model, output_path, **options):
+    with open("config/prompts.yaml", encoding="utf-8") as f:
+        prompts = yaml.safe_load(f)
+    mode = next(iter(prompts["analysis_modes"]))
+    return BatchRunner(model, prompts, mode, str(output_path), video_processor=FakeVideoProcessor(), **options)
+
+
+def test_resume_skips_only_identical_settings(tmp_path):
+    image = tmp_path / "a.png"
+    video = tmp_path / "b.mp4"
+    Image.new("RGB", (16, 16)).save(image)
+    video.write_bytes(b"not decoded by the fake processor")
+    inputs = [str(image), str(video)]
+    output = tmp_path / "results.jsonl"
+
+    assert make_runner(FakeModel(), output).run(inputs)['ok'] == 2
+    assert make_runner(FakeModel(), output).run(inputs)['skipped'] == 2
+
+    # Options that change the output redo the inputs they affect
+    assert make_runner(FakeModel(), output, custom_instruction="Make it blue").run(inputs)['skipped'] == 0
+    assert make_runner(FakeModel(), output, strategy_value=9).run(inputs)['skipped'] == 1 # Image unaffected
+    assert make_runner(FakeModel(), output, strategy="interval").run(inputs)['skipped'] == 1
+    assert make_runner(FakeModel(encoder=ImageEncoder(quality=50)), output).run(inputs)['skipped'] == 0
+    assert make_runner(FakeModel(temperature=0.2), output).run(inputs)['skipped'] == 0
@@ -0,0 +1,23 @@
+from PIL import Image
+
+from core.frame_dedup import FrameDeduplicator
+from core.image_encoder import ImageEncoder, clear_encode_cache
+
+
+def test_payload_savings_come_from_encoder_cache():
+    clear_encode_cache()
+    dark = Image.new("RGB", (64, 64), (10, 10, 10))
+    frames = [dark, dark.copy(), Image.effect_mandelbrot((64, 64), (-2, -1.5, 1, 1.5), 50).convert("RGB")]
+    encoder = ImageEncoder(format="JPEG", quality=70)
+
+    kept, report = FrameDeduplicator().deduplicate(frames, encoder=encoder)
+
+    assert report['kept_indices'] == [0, 2]
+    payloads = [encoder.encode_one(frame) for frame in frames]
+    assert report['bytes_before'] == sum(len(p) for p in payloads)
+    assert report['bytes_saved'] == len(payloads[1])
+
+    # The request reuses the payloads encoded for the report
+    _, encode_report = encoder.encode(kept)
+    assert encode_report['cache_hits'] == 2
+    assert encode_report['encoded'] == 0
@@ -0,0 +1,55 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+from core.frame_store import FrameStore
+
+
+def noise(seed, size=(256, 256)):
+    pixels = np.random.default_rng(seed).integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+    return Image.fromarray(pixels)
+
+
+def png_bytes(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_uploads_are_recompressed():
+    store = FrameStore(quality=80)
+    data = png_bytes(noise(0))
+    key = store.add_bytes(data, label="upload.png")
+    stored = store.get_bytes(key)
+    assert len(stored) < len(data)
+    assert Image.open(io.BytesIO(stored)).format == "JPEG"
+    assert store.entry(key)["size"] == (256, 256)
+
+
+def test_transparent_uploads_are_flattened_on_white():
+    store = FrameStore()
+    key = store.add_bytes(png_bytes(Image.new("RGBA", (32, 32), (0, 0, 0, 0))))
+    assert store.get(key).getpixel((16, 16))[0] > 250
+
+
+def test_compressed_bytes_stay_within_budget():
+    store = FrameStore(memory_budget_mb=0.25, quality=95)
+    keys = [store.add_image(noise(i), source="video") for i in range(20)]
+    kept = [key for key in keys if key is not None]
+
+    assert 0 < len(kept) < 20
+    assert keys[:len(kept)] == kept # The first frames are kept, later ones refused
+    assert store.count("video") == len(kept)
+    assert store.dropped("video") == 20 - len(kept)
+    assert store.memory_usage()["compressed_bytes"] <= store.memory_budget_bytes
+
+    # Decoded views are evicted to make room; compressed frames stay
+    for key in kept:
+        store.get(key)
+    assert store.memory_usage()["total_bytes"] <= store.memory_budget_bytes + 256 * 256 * 3
+
+    store.clear("video")
+    assert store.dropped() == 0
+    assert store.memory_usage()["compressed_bytes"] == 0
+    assert store.add_image(noise(0), source="video") is not None
@@ -0,0 +1,63 @@
+import time
+
+import pytest
+
+from core.prompt_manager import Observer, YamlPromptLoader, _ConfigFileHandler
+
+SETTINGS = "model:\n  name: test\n"
+SETTLE_SECONDS = 4 * _ConfigFileHandler.DEBOUNCE_SECONDS
+PROMPTS = "system_prompt: Hello\nanalysis_modes: {}\nstyle_categories: {}\n"
+
+
+@pytest.fixture
+def loader(tmp_path):
+    settings_path = tmp_path / "settings.yaml"
+    prompts_path = tmp_path / "prompts.yaml"
+    settings_path.write_text(SETTINGS, encoding="utf-8")
+    prompts_path.write_text(PROMPTS, encoding="utf-8")
+    loader = YamlPromptLoader(str(settings_path), str(prompts_path), cache_dir=None)
+    yield loader
+    loader.stop()
+
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return condition()
+
+
+@pytest.mark.skipif(Observer is None, reason="watchdog not installed")
+def test_watcher_reloads_on_change_only(loader, tmp_path):
+    calls = []
+    reload = loader.reload
+    loader.reload = lambda *args, **kwargs: calls.append(1) or reload(*args, **kwargs)
+    assert loader.watch()
+    calls.clear()
+
+    # Reads (open/close events) must not trigger reloads
+    loader.reload()
+    time.sleep(SETTLE_SECONDS)
+    assert len(calls) == 1
+
+    (tmp_path / "prompts.yaml").write_text(PROMPTS + "extra: 1\n", encoding="utf-8")
+    assert wait_for(lambda: loader.snapshot().version == 2)
+    assert loader.load_config()[1]["extra"] == 1
+
+    # Settled: no reload loop after the change
+    time.sleep(SETTLE_SECONDS)
+    settled = len(calls)
+    time.sleep(SETTLE_SECONDS)
+    assert len(calls) == settled
+    assert loader.snapshot().version == 2
+
+
+def test_mtime_check_without_watcher(loader, tmp_path):
+    assert loader.snapshot().version == 1
+    assert loader.snapshot().version == 1
+    (tmp_path / "settings.yaml").write_text(SETTINGS + "extra: 1\n", encoding="utf-8")
+    assert loader.snapshot().version == 2
+    assert loader.load_config()[0]["extra"] == 1
+
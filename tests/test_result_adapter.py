@@ -0,0 +1,50 @@
+import json
+import random
+
+import pytest
+
+from core.result_adapter import StreamingJSONScanner
+
+# Strings with escapes: ordinary escaped chars (\t, \u, \n) as well as \\ and \"
+ESCAPED_STREAMS = [
+    '{"a": "x\\ty"}',
+    '{"a": "x\\u00e9"}',
+    '```json\n{"a": "line1\\nline2"}\n```',
+    'Result: {"path": "C:\\\\dir\\\\", "quote": "say \\"hi\\""} done',
+    '{"a": "\\\\"} and {"b": "\\"}\\""}',
+    '{"a1\\a\n{"k": 1}',
+]
+
+
+def scan(chunks):
+    scanner = StreamingJSONScanner()
+    for chunk in chunks:
+        scanner.feed(chunk)
+    return [(event.data, event.start, event.end) for event in scanner.events]
+
+
+def random_split(text, rng):
+    cuts = sorted(rng.sample(range(1, len(text)), rng.randint(1, min(6, len(text) - 1))))
+    return [text[i:j] for i, j in zip([0] + cuts, cuts + [len(text)])]
+
+
+@pytest.mark.parametrize("text", ESCAPED_STREAMS)
+def test_escapes_match_json(text):
+    events = scan([text])
+    assert events
+    for data, start, end in events:
+        assert data == json.loads(text[start:end])
+
+
+@pytest.mark.parametrize("text", ESCAPED_STREAMS)
+def test_chunking_does_not_change_events(text):
+    expected = scan([text])
+    assert scan(list(text)) == expected # One char per chunk
+    rng = random.Random(text)
+    for _ in range(200):
+        assert scan(random_split(text, rng)) == expected
+
+
+def test_escaped_char_then_newline_drops_candidate():
+    assert [data for data, _, _ in scan(['{"a1\\a\n{"k": 1}'])] == [{"k": 1}]
+    assert [data for data, _, _ in scan(['{"a1\\', 'a\n{"k": 1}'])] == [{"k": 1}]
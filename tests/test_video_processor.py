@@ -0,0 +1,58 @@
+import io
+import json
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from core.frame_cache import MANIFEST_NAME, FrameCache
+from core.video_processor import VideoProcessor
+
+
+@pytest.fixture
+def video_path(tmp_path):
+    """A 3 s, 10 fps video whose frames get brighter over time."""
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+    if not writer.isOpened():
+        pytest.skip("No video encoder available")
+    for i in range(30):
+        writer.write(np.full((48, 64, 3), i * 8, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def test_parallel_extraction_with_cache(video_path, tmp_path):
+    cache = FrameCache(cache_dir=str(tmp_path / "frames"))
+    processor = VideoProcessor(parallel=True, workers=2, cache=cache)
+
+    frames = list(processor.iter_frames(video_path, "count", 5))
+    assert len(frames) == 5
+    assert all(type(frame.index) is int for frame in frames)
+    assert [frame.index for frame in frames] == sorted(frame.index for frame in frames)
+
+    # Written to the cache, and served from it on the next extraction
+    metadata_files = [os.path.join(root, name) for root, _, names in os.walk(cache.cache_dir)
+                      for name in names if name == MANIFEST_NAME]
+    assert metadata_files
+    for metadata_file in metadata_files:
+        with open(metadata_file, encoding="utf-8") as f:
+            json.load(f)
+
+    cached = list(processor.iter_frames(video_path, "count", 5))
+    assert [(f.index, f.timestamp) for f in cached] == [(f.index, f.timestamp) for f in frames]
+
+
+def test_spool_keys_file_objects_by_content(video_path, tmp_path, monkeypatch):
+    monkeypatch.setattr("core.video_processor.SPOOL_DIR", str(tmp_path / "spool"))
+    processor = VideoProcessor()
+    with open(video_path, "rb") as f:
+        data = f.read()
+
+    first = processor.spool(io.BytesIO(data))
+    assert processor.spool(io.BytesIO(data)) == first
+    other = processor.spool(io.BytesIO(data + b"\0"))
+    assert other != first
+    with open(other, "rb") as f:
+        assert f.read() == data + b"\0"
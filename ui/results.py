@@ -0,0 +1,164 @@
+import datetime
+import json
+import uuid
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import streamlit as st
+
+from core.result_adapter import ResultAdapter
+
+# ALT POV smart view: one tab per mood, with the look numbers it holds
+LOOK_TABS = [
+    ("🌑 DARK (1-5)", range(1, 6)),
+    ("🔌 TECH (6-10)", range(6, 11)),
+    ("🌈 COLOR (11-15)", range(11, 16)),
+    ("✨ LIGHT (16-20)", range(16, 21)),
+    ("🔥 BONUS (21-22)", range(21, 23)),
+    ("💋 FETISH (23-28)", range(23, 29)),
+]
+
+# Title keywords: final prompts are shown first and expanded, intermediate analysis collapsed
+FINAL_KEYWORDS = ['unified', 'final', 'reproduction', 'prompt', 'look', 'variant']
+INTERMEDIATE_KEYWORDS = ['logic', 'reasoning', 'analysis', 'layer', 'json']
+
+VIEW_CACHE_SIZE = 4 # Result views kept in session state
+
+
+class PromptView(NamedTuple):
+    """A parsed prompt with everything the result views derive from it."""
+    index: int # Position in parsed['prompts'] (used in widget keys)
+    title: str
+    content: str
+    expanded: bool
+    looks: Optional[Dict[int, Tuple[int, int]]] # ALT POV look spans (None = standard display)
+    intro: str # Text before the first look
+    filename: str
+    download_data: str # Content + generation info (current result)
+    persist_download_data: str # Content + generation info (last analysis)
+
+
+class ResultView(NamedTuple):
+    """Ready-to-render view of an analysis result."""
+    result_id: str
+    prompts: List[PromptView] # Parse order
+    ordered: List[PromptView] # Final prompts first, then intermediate
+    json_data: Any # With its download ID
+    json_filename: str
+    json_download: str
+
+
+def build_result_view(result: Dict[str, Any], result_id: str, parser: Optional[ResultAdapter] = None) -> ResultView:
+    """
+    Derives prompt order, expansion, looks and download payloads from a result.
+
+    Args:
+        result: Result dict ('parsed', 'mode', 'style', ...) as kept in session state.
+        result_id: ID the view is cached under.
+        parser: Indexes looks of results parsed without a look index.
+    """
+    parser = parser or ResultAdapter()
+    parsed = result.get('parsed', {})
+    mode = result.get('mode')
+    now = datetime.datetime.now()
+    timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
+    file_timestamp = now.strftime("%d%m%Y_%H%M%S")
+
+    footer = f"""
+# ========================================
+# GENERATION INFO
+# ========================================
+# Generated: {timestamp}
+# Analysis Mode: {mode}
+"""
+    if result.get('style'):
+        footer += f"# Style: {result['style']}\n"
+    footer += "# ========================================\n"
+    persist_footer = f"""
+
+# ========================================
+# GENERATION INFO
+# ========================================
+# Generated: {timestamp}
+# Analysis Mode: {mode}
+# ========================================
+"""
+
+    prompts = parsed.get('prompts') or []
+    views = []
+    final, intermediate = [], []
+    for i, (title, content) in enumerate(prompts):
+        title_lower = title.lower()
+        is_final = (any(x in title_lower for x in FINAL_KEYWORDS)
+                    or not any(x in title_lower for x in INTERMEDIATE_KEYWORDS))
+
+        looks = None
+        intro = ""
+        if mode == 'alt_pov' and "LOOK 1:" in content:
+            # Looks indexed once at parse time (older results: index now)
+            looks = parsed.get('looks', {}).get(i) or parser.index_looks(content)
+            intro = content[:looks[1][0]] if 1 in looks else content
+
+        short_title = "_".join(title.split()[:5]).lower()
+        short_title = "".join(c if c.isalnum() or c == "_" else "" for c in short_title)
+
+        view = PromptView(
+            index=i,
+            title=title,
+            content=content,
+            expanded=is_final or len(prompts) <= 2,
+            looks=looks,
+            intro=intro,
+            filename=f"{short_title}_{file_timestamp}.txt",
+            download_data=content + footer,
+            persist_download_data=content + persist_footer,
+        )
+        views.append(view)
+        (final if is_final else intermediate).append(view)
+
+    json_data = parsed.get('json_data')
+    json_timestamp = now.strftime("%d%m%Y%H%M%S")
+    if isinstance(json_data, dict):
+        json_data = dict(json_data, id=f"ID_{json_timestamp}")
+
+    return ResultView(
+        result_id=result_id,
+        prompts=views,
+        ordered=final + intermediate,
+        json_data=json_data,
+        json_filename=f"biome_ID_{json_timestamp}.json",
+        json_download=json.dumps(json_data, indent=4) if json_data is not None else "",
+    )
+
+
+def get_result_view(result: Dict[str, Any], parser: Optional[ResultAdapter] = None) -> ResultView:
+    """
+    The view of a result, built once per result ID and cached in session state,
+    so reruns (ratings, comments, checkboxes...) only render widgets.
+    """
+    views = st.session_state.setdefault('result_views', {})
+    result_id = result.setdefault('result_id', uuid.uuid4().hex)
+    view = views.get(result_id)
+    if view is None:
+        view = views[result_id] = build_result_view(result, result_id, parser)
+        while len(views) > VIEW_CACHE_SIZE:
+            views.pop(next(iter(views)))
+    return view
+
+
+def render_look_tabs(content: str, looks: Dict[int, Tuple[int, int]], label_prefix: str):
+    """
+    Renders ALT POV looks in mood tabs, each as an editable text area + copy block.
+
+    Args:
+        content: Prompt text holding the looks.
+        looks: {look number: (start, end)} spans in `content` (see ResultAdapter.index_looks).
+        label_prefix: Text area labels are f"{label_prefix}{look number}".
+    """
+    for tab, (_, numbers) in zip(st.tabs([label for label, _ in LOOK_TABS]), LOOK_TABS):
+        with tab:
+            for num in numbers:
+                if num in looks:
+                    start, end = looks[num]
+                    look = content[start:end].strip()
+                    st.text_area(f"{label_prefix}{num}", value=look, height=150, label_visibility="collapsed")
+                    st.code(look, language="markdown")
@@ -0,0 +1,100 @@
+import time
+from typing import Dict, Iterable, Iterator, List
+
+
+class StreamRenderer:
+    """
+    Renders streamed model output into a Streamlit placeholder, throttled.
+
+    Chunks are buffered and the placeholder is only re-rendered when
+    `interval` seconds have passed or `max_pending_chars` characters are
+    waiting, plus a final full render on close(). Keeps rendering cost
+    bounded (a few updates per second) however many chunks the model sends,
+    and measures time spent rendering vs. waiting for the model.
+    """
+
+    def __init__(self, placeholder, interval: float = 0.1, max_pending_chars: int = 2000, cursor: str = "▌"):
+        """
+        Args:
+            placeholder: Streamlit element with a markdown() method (e.g. st.empty()).
+            interval: Min seconds between two renders.
+            max_pending_chars: Render earlier once this many new characters are buffered.
+            cursor: Appended while streaming ("" for none).
+        """
+        self.placeholder = placeholder
+        self.interval = interval
+        self.max_pending_chars = max_pending_chars
+        self.cursor = cursor
+
+        self._parts: List[str] = []
+        self._pending_chars = 0
+        self._last_flush = 0.0
+        self._closed = False
+        self.chunks = 0
+        self.chars = 0
+        self.flushes = 0
+        self.render_seconds = 0.0
+        self.model_seconds = 0.0
+
+    @property
+    def text(self) -> str:
+        """Everything received so far."""
+        if len(self._parts) > 1:
+            self._parts = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def write(self, chunk: str):
+        """Buffers a chunk; renders if the time or size budget is exhausted."""
+        if not chunk:
+            return
+        self._parts.append(chunk)
+        self.chunks += 1
+        self.chars += len(chunk)
+        self._pending_chars += len(chunk)
+        if (self._pending_chars >= self.max_pending_chars
+                or time.perf_counter() - self._last_flush >= self.interval):
+            self.flush()
+
+    def stream(self, chunks: Iterable[str]) -> Iterator[str]:
+        """
+        Renders a chunk iterator while passing the chunks through, timing the
+        wait on the model separately from rendering. Closes the renderer at the end.
+        """
+        iterator = iter(chunks)
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                self.model_seconds += time.perf_counter() - start
+                break
+            self.model_seconds += time.perf_counter() - start
+            self.write(chunk)
+            yield chunk
+        self.close()
+
+    def flush(self, final: bool = False):
+        """Renders the full text now."""
+        start = time.perf_counter()
+        self.placeholder.markdown(self.text + ("" if final else self.cursor))
+        now = time.perf_counter()
+        self.render_seconds += now - start
+        self.flushes += 1
+        self._pending_chars = 0
+        self._last_flush = now
+
+    def close(self) -> str:
+        """Final render without the cursor. Returns the full text."""
+        if not self._closed:
+            self._closed = True
+            self.flush(final=True)
+        return self.text
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            'chunks': self.chunks,
+            'chars': self.chars,
+            'renders': self.flushes,
+            'render_seconds': self.render_seconds,
+            'model_seconds': self.model_seconds,
+        }